@@ -0,0 +1,42 @@
+"""
+Compares two reports of benchmarks.routes route by route:
+
+    python -m benchmarks.compare before.json after.json
+"""
+
+import argparse
+import json
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def compare(before: dict, after: dict) -> list[str]:
+    """Returns a line per route with relative changes of every metric."""
+
+    lines = []
+    for name, result in after["routes"].items():
+        baseline = before["routes"].get(name)
+        if baseline is None:
+            lines.append(f"{name:>28}: new")
+            continue
+
+        changes = []
+        for metric in METRICS:
+            change = (result[metric] - baseline[metric]) / baseline[metric] * 100 if baseline[metric] else 0.0
+            changes.append(f"{metric} {result[metric]:9.2f} ({change:+6.1f}%)")
+        lines.append(f"{name:>28}: " + "  ".join(changes))
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as before_file, open(args.after, encoding="utf-8") as after_file:
+        before_report, after_report = json.load(before_file), json.load(after_file)
+
+    print(f"{before_report.get('commit')} -> {after_report.get('commit')}")
+    for line in compare(before_report, after_report):
+        print(line)
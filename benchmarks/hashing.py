@@ -0,0 +1,68 @@
+"""
+Measures redirect latency while /api/token is under load.
+
+Every token request verifies a bcrypt hash. If hashing ran on the event loop, each one would stall
+all in-flight redirects for the duration of the hash:
+
+    python -m benchmarks.hashing --requests 2000 --concurrency 20 --logins 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+
+from httpx import AsyncClient
+
+from shortly.core.database import async_engine
+from shortly.core.rate_limit import rate_limiters
+from shortly.models.base import Base
+from shortly.main import app
+from . import loadgen
+from .redirect import measure, seed
+
+
+async def login_storm(client: AsyncClient, form: dict[str, str], workers: int) -> None:
+    """Requests tokens from concurrent workers until cancelled."""
+
+    async def worker() -> None:
+        while True:
+            await client.post("/api/token", data=form)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def main(requests: int, concurrency: int, logins: int) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # every request comes from the same client, which rate limits would throttle
+    rate_limiters.clear()
+
+    async with AsyncClient(app=app, base_url="http://localhost", timeout=None) as client:
+        form, key = await seed(client)
+        url = f"/{key}"
+
+        await measure(client, url, concurrency, concurrency)  # warm-up
+        idle = await measure(client, url, requests, concurrency)
+
+        storm = asyncio.create_task(login_storm(client, form, logins))
+        await asyncio.sleep(0.5)
+        loaded = await measure(client, url, requests, concurrency)
+        storm.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await storm
+
+        for name, result in (("idle", idle), ("logins", loaded)):
+            print(loadgen.format_result(name, result))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=8, help="concurrent /api/token clients")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency, args.logins))
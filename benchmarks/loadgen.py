@@ -0,0 +1,50 @@
+"""Concurrent load generator shared by the benchmarks."""
+
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+
+from httpx import Response
+
+
+async def run(send: Callable[[int], Awaitable[Response]], requests: int, concurrency: int) -> dict[str, float]:
+    """
+    Calls send from concurrent workers and returns throughput, error count and latency percentiles.
+    Every worker passes its own index to send, so requests may depend on per-worker state.
+    """
+
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(index: int, count: int) -> None:
+        nonlocal errors
+        for _ in range(count):
+            start = time.perf_counter()
+            response = await send(index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index, requests // concurrency) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p95_ms": round(percentiles[94] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+    }
+
+
+def format_result(name: str, result: dict[str, float]) -> str:
+    """Formats a result as a single line of a report."""
+
+    return (
+        f"{name:>28}: {result['rps']:8.0f} rps  p50 {result['p50_ms']:7.2f} ms  "
+        f"p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}"
+    )
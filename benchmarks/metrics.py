@@ -0,0 +1,81 @@
+"""
+Measures the overhead of metrics instrumentation per request and per database query.
+
+The middleware wraps an ASGI app that answers immediately, query hooks are called with a dummy context,
+so only the instrumentation itself is timed:
+
+    python -m benchmarks.metrics --iterations 100000
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from shortly.core.metrics import instrument_engine, MetricsMiddleware, request_db_stats
+
+
+async def endpoint():
+    pass
+
+
+class App:
+    """ASGI app with a single route, answering every request with 200 right away."""
+
+    routes = [SimpleNamespace(path="/items/{key}", endpoint=endpoint)]
+
+    async def __call__(self, scope, receive, send):
+        scope["endpoint"] = endpoint
+        await send({"type": "http.response.start", "status": 200})
+
+
+async def send(message):
+    pass
+
+
+async def time_requests(app, iterations: int) -> float:
+    """Returns seconds per request."""
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app({"type": "http", "method": "GET", "app": App}, None, send)
+    return (time.perf_counter() - started) / iterations
+
+
+def time_query_hooks(iterations: int) -> float:
+    """Returns seconds spent in the query hooks per query."""
+
+    # the engine never connects, its hooks are called directly
+    engine = create_async_engine("postgresql+asyncpg://benchmark@localhost/benchmark")
+    instrument_engine(engine, "benchmark")
+    (before,) = engine.sync_engine.dispatch.before_cursor_execute
+    (after,) = engine.sync_engine.dispatch.after_cursor_execute
+
+    context = SimpleNamespace()
+    token = request_db_stats.set([0, 0.0])
+    started = time.perf_counter()
+    for _ in range(iterations):
+        before(None, None, "", None, context, False)
+        after(None, None, "", None, context, False)
+    elapsed = time.perf_counter() - started
+    request_db_stats.reset(token)
+    return elapsed / iterations
+
+
+async def main(iterations: int) -> None:
+    bare = await time_requests(App(), iterations)
+    instrumented = await time_requests(MetricsMiddleware(App()), iterations)
+    hooks = time_query_hooks(iterations)
+
+    print(f"{'middleware':>12}: {(instrumented - bare) * 1e6:6.2f} us per request")
+    print(f"{'query hooks':>12}: {hooks * 1e6:6.2f} us per query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,65 @@
+"""
+Compares the root-level redirect route with the JSON link route.
+
+The application runs in-process against the database configured by the usual environment variables,
+so the numbers reflect framework and database overhead without network hops:
+
+    python -m benchmarks.redirect --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import uuid
+
+from httpx import AsyncClient
+
+from shortly.core.database import async_engine
+from shortly.models.base import Base
+from shortly.main import app
+from . import loadgen
+
+
+async def seed(client: AsyncClient) -> tuple[dict[str, str], str]:
+    """Creates a user with a single link and returns the login form of the user and the key of the link."""
+
+    credentials = {"login": f"bench_{uuid.uuid4().hex[:8]}", "password": "benchmark_password"}
+    await client.post("/api/users", json=credentials)
+    form = {"username": credentials["login"], "password": credentials["password"], "grant_type": "password"}
+    response = await client.post("/api/token", data=form)
+    headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+
+    response = await client.post("/api/links", json={"original_url": "http://example.com"}, headers=headers)
+    return form, response.json()["short_key"]
+
+
+async def measure(client: AsyncClient, url: str, requests: int, concurrency: int) -> dict[str, float]:
+    """Sends GET requests to url from concurrent workers and returns throughput and latency percentiles."""
+
+    result = await loadgen.run(lambda _: client.get(url), requests, concurrency)
+    if result["errors"]:
+        raise RuntimeError(f"{url} answered {result['errors']} requests with an error")
+    return result
+
+
+async def main(requests: int, concurrency: int) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncClient(app=app, base_url="http://localhost") as client:
+        _, key = await seed(client)
+
+        for name, url in (("json", f"/api/links/{key}"), ("redirect", f"/{key}")):
+            await measure(client, url, concurrency, concurrency)  # warm-up
+            result = await measure(client, url, requests, concurrency)
+            print(loadgen.format_result(name, result))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency))
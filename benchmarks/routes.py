@@ -0,0 +1,173 @@
+"""
+Measures throughput and latency of every hot API route and writes them to a JSON report.
+
+The application runs in-process against the database configured by the usual environment variables.
+Every worker gets its own user with a set of links, keys are picked by a seeded random generator,
+so two runs with the same arguments send the same requests:
+
+    python -m benchmarks.routes --links 1000 --requests 5000 --concurrency 50 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from httpx import AsyncClient, Response
+
+from shortly.core.config import settings
+from shortly.core.database import async_engine
+from shortly.core.rate_limit import rate_limiters
+from shortly.models.base import Base
+from shortly.main import app
+from . import loadgen
+
+
+class Worker:
+    """A benchmark user with its credentials, tokens and links."""
+
+    def __init__(self, form: dict[str, str], keys: list[str], seed: int) -> None:
+        self.form = form
+        self.keys = keys
+        self.random = random.Random(seed)
+
+        self.headers: dict[str, str] = {}
+        self.refresh_token = ""
+
+    def update_tokens(self, tokens: dict[str, str]) -> None:
+        self.headers = {"Authorization": "Bearer " + tokens["access_token"]}
+        self.refresh_token = tokens["refresh_token"]
+
+
+async def seed_worker(client: AsyncClient, links: int, seed: int) -> Worker:
+    """Creates a user with links batch by batch."""
+
+    credentials = {"login": f"bench_{uuid.uuid4().hex[:8]}", "password": "benchmark_password"}
+    await client.post("/api/users", json=credentials)
+    form = {"username": credentials["login"], "password": credentials["password"], "grant_type": "password"}
+
+    worker = Worker(form, [], seed)
+    response = await client.post("/api/token", data=form)
+    worker.update_tokens(response.json())
+
+    for offset in range(0, links, settings.LINK_BATCH_MAX_SIZE):
+        batch = [
+            {"original_url": f"http://example.com/{seed}/{number}"}
+            for number in range(offset, min(links, offset + settings.LINK_BATCH_MAX_SIZE))
+        ]
+        response = await client.post("/api/links/batch", json={"links": batch}, headers=worker.headers)
+        worker.keys.extend(item["short_key"] for item in response.json()["links"])
+
+    return worker
+
+
+def route_senders(client: AsyncClient, workers: list[Worker]) -> dict[str, Callable[[int], Awaitable[Response]]]:
+    """Returns a request sender for every measured route, each takes index of a worker."""
+
+    async def get_link(index: int) -> Response:
+        worker = workers[index]
+        return await client.get(f"/api/links/{worker.random.choice(worker.keys)}")
+
+    async def redirect(index: int) -> Response:
+        worker = workers[index]
+        return await client.get(f"/{worker.random.choice(worker.keys)}")
+
+    async def get_links(index: int) -> Response:
+        return await client.get("/api/links", headers=workers[index].headers)
+
+    # every login and refresh replaces the stored refresh token, a worker always uses its latest one
+    async def get_token(index: int) -> Response:
+        worker = workers[index]
+        response = await client.post("/api/token", data=worker.form)
+        if response.status_code == 200:
+            worker.update_tokens(response.json())
+        return response
+
+    async def refresh_token(index: int) -> Response:
+        worker = workers[index]
+        response = await client.post("/api/refresh-token", params={"refresh_token": worker.refresh_token})
+        if response.status_code == 200:
+            worker.update_tokens(response.json())
+        return response
+
+    async def health(_: int) -> Response:
+        return await client.get("/api/health")
+
+    return {
+        "GET /api/links/{key}": get_link,
+        "GET /{key}": redirect,
+        "GET /api/links": get_links,
+        "POST /api/token": get_token,
+        "POST /api/refresh-token": refresh_token,
+        "GET /api/health": health,
+    }
+
+
+def git_commit() -> str | None:
+    """Returns the checked out commit, if any."""
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # every request comes from the same client, which rate limits would throttle
+    rate_limiters.clear()
+
+    routes: dict[str, dict[str, float]] = {}
+    async with AsyncClient(app=app, base_url="http://localhost", timeout=None) as client:
+        workers = [await seed_worker(client, args.links, args.seed + index) for index in range(args.concurrency)]
+
+        for name, send in route_senders(client, workers).items():
+            if args.routes and name not in args.routes:
+                continue
+
+            # logins verify a password hash and are orders of magnitude slower than anything else
+            requests = args.token_requests if name == "POST /api/token" else args.requests
+
+            await loadgen.run(send, args.concurrency, args.concurrency)  # warm-up
+            routes[name] = await loadgen.run(send, requests, args.concurrency)
+            print(loadgen.format_result(name, routes[name]))
+
+    await async_engine.dispose()
+
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parameters": {
+            "links": args.links,
+            "requests": args.requests,
+            "token_requests": args.token_requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "routes": routes,
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=1000, help="links created for every worker")
+    parser.add_argument("--requests", type=int, default=5000, help="requests sent to every route")
+    parser.add_argument("--token-requests", type=int, default=500, help="requests sent to /api/token")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--route", dest="routes", action="append", help="measure only this route, may be repeated")
+    parser.add_argument("--output", default="benchmark.json")
+
+    asyncio.run(main(parser.parse_args()))
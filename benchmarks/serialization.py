@@ -0,0 +1,77 @@
+"""
+Measures CPU time spent serializing a page of links, the way GET /api/links does it.
+
+The default path validates ORM objects against the response model and encodes them with the standard json module,
+the fast path encodes plain rows with orjson, or with the standard json module when orjson is not installed:
+
+    python -m benchmarks.serialization --links 10000 --iterations 20
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from shortly.models.link import Link
+from shortly.schemas.link import LinkOut
+from shortly.service import link as link_service
+
+
+def make_links(count: int) -> list[Link]:
+    """Returns links as the repository loads them, every other one with an expiry date."""
+
+    expiry_date = datetime.utcnow() + timedelta(days=30)
+    return [
+        Link(
+            id=500_000 + i,
+            short_key=link_service.encode_base62(500_000 + i),
+            original_url=f"https://example.com/articles/{i}?utm_source=benchmark",
+            expiry_date=expiry_date if i % 2 else None,
+        )
+        for i in range(count)
+    ]
+
+
+async def time_per_response(serialize: Callable, iterations: int) -> float:
+    """Returns CPU seconds per response."""
+
+    started = time.process_time()
+    for _ in range(iterations):
+        await serialize()
+    return (time.process_time() - started) / iterations
+
+
+async def main(links: int, iterations: int) -> None:
+    db_links = make_links(links)
+    rows = [(link.id, link.short_key, link.original_url, link.expiry_date) for link in db_links]
+    field = create_response_field(name="Response_get_all_links", type_=list[LinkOut])
+
+    async def validated() -> bytes:
+        content = await serialize_response(field=field, response_content=db_links, is_coroutine=True)
+        return JSONResponse(content).body
+
+    async def fast() -> bytes:
+        return link_service.encode_links(rows)
+
+    assert await validated() == await fast()
+
+    print(f"{'validated':>10}: {await time_per_response(validated, iterations) * 1e3:8.2f} ms CPU per response")
+    print(f"{'fast':>10}: {await time_per_response(fast, iterations) * 1e3:8.2f} ms CPU per response")
+    if link_service.orjson is not None:
+        link_service.orjson, orjson = None, link_service.orjson
+        print(f"{'fast json':>10}: {await time_per_response(fast, iterations) * 1e3:8.2f} ms CPU per response")
+        link_service.orjson = orjson
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.links, args.iterations))
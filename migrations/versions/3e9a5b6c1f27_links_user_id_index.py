@@ -0,0 +1,34 @@
+"""links user id index
+
+Revision ID: 3e9a5b6c1f27
+Revises: 8c1d2e7f4a90
+Create Date: 2026-10-18 12:40:03.918264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9a5b6c1f27'
+down_revision = '8c1d2e7f4a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_user_id_id',
+            'links',
+            ['user_id', 'id'],
+            unique=False,
+            postgresql_where=sa.text('disabled IS false'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_links_user_id_id', table_name='links', postgresql_concurrently=True)
@@ -0,0 +1,26 @@
+"""links id blocks
+
+Revision ID: 8c1d2e7f4a90
+Revises: 2f5f05b2dc03
+Create Date: 2026-10-18 10:12:41.502117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d2e7f4a90'
+down_revision = '2f5f05b2dc03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # every nextval reserves a block of 1000 ids (see LINKS_ID_BLOCK_SIZE)
+    op.execute("CREATE SEQUENCE IF NOT EXISTS links_id_seq START WITH 500000 INCREMENT BY 1000")
+    op.execute("ALTER SEQUENCE links_id_seq INCREMENT BY 1000")
+
+
+def downgrade() -> None:
+    op.execute("ALTER SEQUENCE links_id_seq INCREMENT BY 1")
@@ -0,0 +1,39 @@
+"""links url hash
+
+Revision ID: a6e1c0d47b38
+Revises: f4c3a9d8e215
+Create Date: 2026-10-18 18:40:27.215804
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e1c0d47b38'
+down_revision = 'f4c3a9d8e215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # a nullable column without a default is added without rewriting the table
+    op.add_column('links', sa.Column('url_hash', sa.BigInteger(), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_user_id_url_hash',
+            'links',
+            ['user_id', 'url_hash'],
+            unique=True,
+            postgresql_where=sa.text('disabled IS false AND expiry_date IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_links_user_id_url_hash', table_name='links', postgresql_concurrently=True)
+
+    op.drop_column('links', 'url_hash')
@@ -0,0 +1,34 @@
+"""links expiry date index
+
+Revision ID: d2a8e6b1c754
+Revises: b7d4f0a2c913
+Create Date: 2026-10-18 15:12:36.504118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8e6b1c754'
+down_revision = 'b7d4f0a2c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_expiry_date',
+            'links',
+            ['expiry_date'],
+            unique=False,
+            postgresql_where=sa.text('disabled IS false AND expiry_date IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_links_expiry_date', table_name='links', postgresql_concurrently=True)
@@ -0,0 +1,33 @@
+"""link clicks hourly bucket index
+
+Revision ID: e5b9d3c7a182
+Revises: c8f2b5e9d417
+Create Date: 2026-10-18 21:40:27.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9d3c7a182'
+down_revision = 'c8f2b5e9d417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_link_clicks_hourly_bucket',
+            'link_clicks_hourly',
+            ['bucket'],
+            postgresql_include=['link_id', 'count'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_link_clicks_hourly_bucket', table_name='link_clicks_hourly', postgresql_concurrently=True)
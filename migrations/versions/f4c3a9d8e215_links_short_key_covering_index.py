@@ -0,0 +1,35 @@
+"""links short key covering index
+
+Revision ID: f4c3a9d8e215
+Revises: d2a8e6b1c754
+Create Date: 2026-10-18 16:02:11.847390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c3a9d8e215'
+down_revision = 'd2a8e6b1c754'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_short_key_enabled',
+            'links',
+            ['short_key'],
+            unique=True,
+            postgresql_where=sa.text('disabled IS false'),
+            postgresql_include=['original_url', 'expiry_date'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_links_short_key_enabled', table_name='links', postgresql_concurrently=True)
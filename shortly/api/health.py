@@ -8,7 +8,7 @@ from fastapi.routing import APIRouter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shortly.core.database import get_session
+from shortly.core.database import get_pool_stats, get_session
 import shortly.schemas.health as health_schemas
 
 router = APIRouter(prefix="/health", tags=["Health"], responses={503: {"description": "Service unavailable"}})
@@ -23,3 +23,10 @@ async def get_health(session: AsyncSession = Depends(get_session)):
     except asyncio.TimeoutError as exc:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE) from exc
     return {"status": "ok"}
+
+
+@router.get("/db", response_model=health_schemas.DatabasePool, status_code=status.HTTP_200_OK)
+async def get_database_pool():
+    """Endpoint to check database connection pool utilization."""
+
+    return get_pool_stats()
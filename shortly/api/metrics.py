@@ -0,0 +1,15 @@
+"""This module provides a root-level route exposing application metrics to Prometheus."""
+
+from fastapi import status
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRouter
+
+from shortly.core.metrics import registry
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+async def get_metrics():
+    """Metrics of this worker process in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,36 @@
+"""
+This module provides a root-level route redirecting short keys to original urls.
+
+The route is kept lean on purpose: no authentication, no response model and a database session
+is only touched when the link is not cached.
+"""
+
+from fastapi import HTTPException, status
+from fastapi.responses import RedirectResponse
+from fastapi.routing import APIRouter
+
+from shortly.core.config import settings
+from shortly.core.database import read_session
+from shortly.repository.link import LinkRepository
+import shortly.service.link as link_service
+
+router = APIRouter(tags=["Redirect"], responses={404: {"description": "Not found"}})
+
+
+@router.get("/{key}", response_class=RedirectResponse, status_code=settings.REDIRECT_STATUS_CODE)
+async def redirect(key: str):
+    """Redirect to the original url of a link."""
+
+    # same constraints as link_schema.KeyType without pydantic validation
+    if not 4 <= len(key) <= 7 or not key.isalnum():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Could not find link by key {key}")
+
+    link = link_service.visit_cached(key)
+    if link is None:
+        async with read_session() as session:
+            link = await link_service.visit(key, LinkRepository(session))
+
+    if not link:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Could not find link by key {key}")
+
+    return RedirectResponse(link.original_url, status_code=settings.REDIRECT_STATUS_CODE)
@@ -4,6 +4,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 import shortly.schemas.user as user_schema
+from shortly.core.cache import principal_cache
 from shortly.core.security import generate_token, decode_token, TokenType
 from shortly.schemas.token import Token
 from shortly.repository.user import UserRepository
@@ -37,8 +38,14 @@ async def get_current_user_from_token(
     if not payload.token_type == token_type.value:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token type mismatch")
 
-    # verify user
-    db_user = await user_repository.get_by_id(int(payload.sub))
+    # verify user, access tokens may be served by a recently verified principal
+    user_id = int(payload.sub)
+    db_user = principal_cache.get(user_id) if token_type == TokenType.ACCESS else None
+    if db_user is None:
+        db_user = await user_repository.get_principal_by_id(user_id)
+        if db_user and token_type == TokenType.ACCESS:
+            principal_cache.set(user_id, db_user)
+
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
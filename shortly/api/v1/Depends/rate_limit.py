@@ -0,0 +1,44 @@
+"""This module contains rate limiting dependencies."""
+
+import math
+from typing import Awaitable, Callable, Hashable
+
+from fastapi import Depends, HTTPException, Request, status
+
+import shortly.schemas.user as user_schema
+from shortly.core.metrics import http_rate_limited_total
+from shortly.core.rate_limit import rate_limiters
+from .oauth import get_current_user
+
+
+def _acquire(name: str, key: Hashable) -> None:
+    limiter = rate_limiters.get(name)
+    if limiter is None:
+        return
+
+    wait = limiter.acquire(key)
+    if wait:
+        http_rate_limited_total.inc((name,))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+def limit_by_ip(name: str) -> Callable[[Request], Awaitable[None]]:
+    """Dependency factory. Limits requests of a client ip by the rate limit of a route name."""
+
+    async def _limit(request: Request) -> None:
+        _acquire(name, request.client.host if request.client else None)
+
+    return _limit
+
+
+def limit_by_user(name: str) -> Callable[[user_schema.UserInDB], Awaitable[None]]:
+    """Dependency factory. Limits requests of the current user by the rate limit of a route name."""
+
+    async def _limit(user: user_schema.UserInDB = Depends(get_current_user)) -> None:
+        _acquire(name, user.id)
+
+    return _limit
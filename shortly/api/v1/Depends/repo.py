@@ -5,14 +5,16 @@ from typing import Callable, Type
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shortly.core.database import get_session
+from shortly.core.database import get_read_session, get_session
 from shortly.repository.base import BaseRepository
 
 
-def get_repository(repository_type: Type[BaseRepository]) -> Callable[[AsyncSession], BaseRepository]:
-    """Helper dependency function. Returns repository."""
+def get_repository(
+    repository_type: Type[BaseRepository], read_only: bool = False
+) -> Callable[[AsyncSession], BaseRepository]:
+    """Helper dependency function. Returns repository, read only ones may be bound to a read replica."""
 
-    def _get_repo(session: AsyncSession = Depends(get_session)) -> BaseRepository:
+    def _get_repo(session: AsyncSession = Depends(get_read_session if read_only else get_session)) -> BaseRepository:
         return repository_type(session)
 
     return _get_repo
@@ -5,10 +5,12 @@ from fastapi.routing import APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 
 import shortly.schemas.user as user_schema
+from shortly.core.security import HasherBusy
 from shortly.schemas.token import Token
 from shortly.repository.user import UserRepository, PasswordDoesNotMatch, UserDoesNotExists
 from .Depends.repo import get_repository
 from .Depends.oauth import create_tokens, get_current_user_with_refresh_token
+from .Depends.rate_limit import limit_by_ip
 
 
 router = APIRouter(tags=["OAuth2"], responses={401: {"description": "Unauthorized"}})
@@ -18,7 +20,12 @@ router = APIRouter(tags=["OAuth2"], responses={401: {"description": "Unauthorize
     "/token",
     response_model=Token,
     status_code=status.HTTP_200_OK,
-    responses={500: {"description": "Internal server error"}},
+    dependencies=[Depends(limit_by_ip("get_tokens"))],
+    responses={
+        429: {"description": "Too many requests"},
+        500: {"description": "Internal server error"},
+        503: {"description": "Service unavailable"},
+    },
 )
 async def get_tokens(
     form: OAuth2PasswordRequestForm = Depends(),
@@ -31,6 +38,12 @@ async def get_tokens(
         db_user = await user_repository.get_by_login_authentication(form.username, form.password)
     except (PasswordDoesNotMatch, UserDoesNotExists) as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password") from exc
+    except HasherBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts",
+            headers={"Retry-After": "1"},
+        ) from exc
 
     token = create_tokens(db_user.id)
 
@@ -43,7 +56,8 @@ async def get_tokens(
     "/refresh-token",
     response_model=Token,
     status_code=status.HTTP_200_OK,
-    responses={400: {"description": "Bad request"}},
+    dependencies=[Depends(limit_by_ip("get_refresh_token"))],
+    responses={400: {"description": "Bad request"}, 429: {"description": "Too many requests"}},
 )
 async def get_refresh_token(
     current_user: user_schema.UserInDB = Depends(get_current_user_with_refresh_token),
@@ -1,13 +1,20 @@
 """This module contains routing for the Links API."""
 
-from fastapi import Depends, HTTPException, Response, Request, status
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, Query, Response, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
+from pydantic import ValidationError
+
+from shortly.core.config import settings
 
 from shortly.repository.link import LinkRepository, LinkDoesNotExists
 import shortly.service.link as link_service
 import shortly.schemas.link as link_schema
 import shortly.schemas.user as user_schema
 from .Depends.oauth import get_current_user
+from .Depends.rate_limit import limit_by_user
 from .Depends.repo import get_repository
 
 
@@ -24,7 +31,12 @@ router = APIRouter(
     "",
     response_model=link_schema.LinkOut,
     status_code=status.HTTP_201_CREATED,
-    responses={401: {"description": "Unauthorized"}, 500: {"description": "Internal server error"}},
+    dependencies=[Depends(limit_by_user("create_link"))],
+    responses={
+        401: {"description": "Unauthorized"},
+        429: {"description": "Too many requests"},
+        500: {"description": "Internal server error"},
+    },
 )
 async def create_link(
     new_link: link_schema.LinkIn,
@@ -36,7 +48,7 @@ async def create_link(
     """Create a new link."""
 
     try:
-        db_link = await link_service.create(new_link.original_url, user.id, link_repository)
+        db_link = await link_service.create(new_link.original_url, user.id, link_repository, new_link.expiry_date)
     except link_service.CreateLinkError as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from exc
 
@@ -45,6 +57,51 @@ async def create_link(
     return db_link
 
 
+@router.post(
+    "/batch",
+    response_model=link_schema.LinkBatchOut,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_by_user("create_links_batch"))],
+    responses={
+        401: {"description": "Unauthorized"},
+        429: {"description": "Too many requests"},
+        500: {"description": "Internal server error"},
+    },
+)
+async def create_links_batch(
+    batch: link_schema.LinkBatchIn,
+    user: user_schema.UserInDB = Depends(get_current_user),
+    link_repository: LinkRepository = Depends(get_repository(LinkRepository)),
+):
+    """Create several links at once. Keys and per-link errors are returned in the input order."""
+
+    if len(batch.links) > settings.LINK_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not create more than {settings.LINK_BATCH_MAX_SIZE} links at once",
+        )
+
+    new_links: dict[int, link_schema.LinkIn] = {}
+    errors: dict[int, str] = {}
+    for position, item in enumerate(batch.links):
+        try:
+            new_links[position] = link_schema.LinkIn.parse_obj(item)
+        except ValidationError as exc:
+            errors[position] = exc.errors()[0]["msg"]
+
+    try:
+        keys = await link_service.create_many(list(new_links.values()), user.id, link_repository)
+    except link_service.CreateLinkError as exc:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from exc
+
+    created = dict(zip(new_links, keys))
+    return {
+        "links": [
+            {"short_key": created.get(position), "error": errors.get(position)} for position in range(len(batch.links))
+        ]
+    }
+
+
 @router.get(
     "",
     response_model=list[link_schema.LinkOut],
@@ -52,12 +109,69 @@ async def create_link(
     responses={401: {"description": "Unauthorized"}},
 )
 async def get_all_links(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.LINKS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.LINKS_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
     user: user_schema.UserInDB = Depends(get_current_user),
-    link_repository: LinkRepository = Depends(get_repository(LinkRepository)),
+    link_repository: LinkRepository = Depends(get_repository(LinkRepository, read_only=True)),
 ):
-    """Get all enabled links created by user."""
+    """
+    Get enabled links created by user, one page at a time.
+    The next page, if any, is referenced by the "next" relation of the Link header.
+    """
+
+    after_id = None
+    if cursor:
+        try:
+            after_id = link_service.decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+    # one extra row tells whether there is a next page
+    if settings.LINKS_FAST_SERIALIZATION:
+        db_links = await link_repository.get_rows_by_user_id(user.id, limit + 1, after_id)
+    else:
+        db_links = await link_repository.get_all_by_user_id(user.id, limit + 1, after_id)
+    if len(db_links) > limit:
+        db_links = db_links[:limit]
+        next_page = request.url.include_query_params(limit=limit, cursor=link_service.encode_cursor(db_links[-1].id))
+        response.headers["link"] = f'<{next_page}>; rel="next"'
 
-    return await link_repository.get_all_by_user_id(user.id)
+    # rows are encoded as they are, instead of validating every link against the response model
+    if settings.LINKS_FAST_SERIALIZATION:
+        return Response(link_service.encode_links(db_links), media_type="application/json", headers=response.headers)
+    return db_links
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+        401: {"description": "Unauthorized"},
+    },
+)
+async def export_links(
+    export_format: link_schema.ExportFormat = Query(link_schema.ExportFormat.NDJSON, alias="format"),
+    user: user_schema.UserInDB = Depends(get_current_user),
+    link_repository: LinkRepository = Depends(get_repository(LinkRepository, read_only=True)),
+):
+    """Export statistics of all enabled links created by user. Links are streamed, not buffered."""
+
+    partitions = link_repository.stream_all_by_user_id(user.id, settings.LINK_EXPORT_BATCH_SIZE)
+
+    if export_format == link_schema.ExportFormat.CSV:
+        content, media_type = link_service.export_csv(partitions), "text/csv"
+    else:
+        content, media_type = link_service.export_ndjson(partitions), "application/x-ndjson"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"content-disposition": f'attachment; filename="links.{export_format.value}"'},
+    )
 
 
 @router.get(
@@ -68,17 +182,15 @@ async def get_all_links(
 )
 async def get_link(
     key: link_schema.KeyType,
-    link_repository: LinkRepository = Depends(get_repository(LinkRepository)),
+    link_repository: LinkRepository = Depends(get_repository(LinkRepository, read_only=True)),
 ):
     """Get specific link by a key."""
 
-    db_link = await link_repository.get_by_key(key)
-    if not db_link:
+    link = await link_service.visit(key, link_repository)
+    if not link:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Could not find link by key {key}")
 
-    await link_repository.increase_view_counter_by_key(key)
-
-    return db_link
+    return link
 
 
 @router.delete(
@@ -107,12 +219,42 @@ async def delete_link(
 )
 async def get_stats(
     key: link_schema.KeyType,
-    link_repository: LinkRepository = Depends(get_repository(LinkRepository)),
+    link_repository: LinkRepository = Depends(get_repository(LinkRepository, read_only=True)),
 ):
     """Get link statistics."""
 
-    db_link = await link_repository.get_by_key(key)
+    db_link = await link_service.get(key, link_repository)
     if not db_link:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Could not find link by key {key}")
 
     return db_link
+
+
+@router.get(
+    "/{key}/stats/timeseries",
+    response_model=link_schema.LinkTimeseries,
+    status_code=status.HTTP_200_OK,
+    responses={404: {"description": "Not found"}},
+)
+async def get_stats_timeseries(
+    key: link_schema.KeyType,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    granularity: link_schema.Granularity = link_schema.Granularity.HOUR,
+    link_repository: LinkRepository = Depends(get_repository(LinkRepository, read_only=True)),
+):
+    """
+    Get link clicks from "from" up to "to" summed by hours, days, weeks or months.
+    The range defaults to the last day. Periods without clicks are omitted, clicks show up after a flush.
+    """
+
+    db_link = await link_service.get(key, link_repository)
+    if not db_link:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Could not find link by key {key}")
+
+    try:
+        buckets = await link_service.get_clicks(db_link, start, end, granularity, link_repository)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return {"short_key": key, "granularity": granularity, "buckets": buckets}
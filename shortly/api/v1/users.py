@@ -3,6 +3,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.routing import APIRouter
 
+from shortly.core.security import HasherBusy
 from shortly.repository.user import UserRepository
 import shortly.schemas.user as user_schemas
 from .Depends.oauth import get_current_user
@@ -17,6 +18,7 @@ router = APIRouter(prefix="/users", tags=["Users"], responses={400: {"descriptio
     response_model=user_schemas.UserOut,
     status_code=status.HTTP_201_CREATED,
     name="create a new user",
+    responses={503: {"description": "Service unavailable"}},
 )
 async def create_user(
     new_user: user_schemas.UserCreate,
@@ -30,7 +32,12 @@ async def create_user(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User with this login already exists")
 
     # create user
-    db_user = await user_repository.create(new_user.login, new_user.password)
+    try:
+        db_user = await user_repository.create(new_user.login, new_user.password)
+    except HasherBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many requests", headers={"Retry-After": "1"}
+        ) from exc
 
     return db_user
 
@@ -38,7 +45,6 @@ async def create_user(
 @router.get(
     "/me",
     response_model=user_schemas.UserOut,
-    response_model_exclude={"links"},
     status_code=status.HTTP_200_OK,
     name="get current user",
     responses={401: {"description": "Unauthorized"}},
@@ -0,0 +1,134 @@
+"""This module provides a Bloom filter of issued short keys."""
+
+import hashlib
+import math
+import string
+
+from .config import settings
+from .metrics import registry, CollectedMetric
+
+
+class BloomFilter:
+    """Probabilistic set of strings. Membership tests may give false positives, never false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        """Adds item to the set."""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def _positions(self, item: str) -> list[int]:
+        # double hashing, two 64-bit halves of one digest make all hash_count positions
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+
+class KeyFilter:
+    """
+    Tells whether a short key may exist without asking the database.
+
+    The filter is built from all enabled keys and every key created by this process is added to it.
+    Keys are base62 encoded sequence ids, so keys created by other processes since the build can be
+    told apart by their ids: ids from the watermark, the lowest id any process could still hand out
+    when the build started, up to the ceiling, a little above the current sequence value, are let through. Ids above
+    the ceiling have not been issued yet. Until the first build completes every key is let through.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.rejected = 0
+
+        self._filter: BloomFilter | None = None
+        self._next_filter: BloomFilter | None = None
+        self._watermark = 0
+        self._ceiling = 0
+
+    @property
+    def ready(self) -> bool:
+        """Whether the filter has been built."""
+        return self._filter is not None
+
+    def might_exist(self, key: str) -> bool:
+        """Returns False only for keys that certainly were never issued or are disabled."""
+
+        if self._filter is None:
+            return True
+
+        link_id = _decode_base62(key)
+        if link_id is not None and link_id < self._ceiling and (link_id >= self._watermark or key in self._filter):
+            return True
+
+        self.rejected += 1
+        return False
+
+    def add(self, key: str) -> None:
+        """Adds a newly created key."""
+
+        if self._filter is not None:
+            self._filter.add(key)
+        if self._next_filter is not None:
+            self._next_filter.add(key)
+
+    def begin_build(self) -> BloomFilter:
+        """Returns an empty filter to be filled with existing keys, keys added meanwhile go to it as well."""
+
+        self._next_filter = BloomFilter(self.capacity, self.error_rate)
+        return self._next_filter
+
+    def finish_build(self, watermark: int, ceiling: int) -> None:
+        """Replaces the filter with the one being built."""
+
+        if self._next_filter is not None:
+            self._filter, self._next_filter = self._next_filter, None
+            self._watermark = watermark
+            self.set_ceiling(ceiling)
+
+    def abort_build(self) -> None:
+        """Drops the filter being built, the current one stays in use."""
+        self._next_filter = None
+
+    def set_ceiling(self, ceiling: int) -> None:
+        """Moves the ceiling, keys of ids from it on are rejected."""
+        self._ceiling = max(self._ceiling, ceiling)
+
+
+_BASE62_DIGITS = {char: value for value, char in enumerate(string.digits + string.ascii_letters)}
+
+
+def _decode_base62(key: str) -> int | None:
+    """Returns id of a short key or None if no id is encoded into it."""
+
+    # ids are encoded without leading zeros
+    if not key or len(key) > 1 and key[0] == "0":
+        return None
+
+    link_id = 0
+    for char in key:
+        digit = _BASE62_DIGITS.get(char)
+        if digit is None:
+            return None
+        link_id = link_id * 62 + digit
+    return link_id
+
+
+key_filter = KeyFilter(settings.KEY_FILTER_CAPACITY, settings.KEY_FILTER_ERROR_RATE)
+
+registry.register(
+    CollectedMetric(
+        "key_filter_rejected_total",
+        "Number of key lookups answered by the key filter without a database query.",
+        "counter",
+        (),
+        lambda: {(): key_filter.rejected},
+    )
+)
@@ -0,0 +1,137 @@
+"""This module provides a bounded in-process cache with per-entry expiration."""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Generic, Hashable, TypeVar
+
+from shortly.schemas.link import LinkOut
+from shortly.schemas.user import UserInDB
+from .config import settings
+from .metrics import registry, CollectedMetric
+
+KT = TypeVar("KT", bound=Hashable)
+VT = TypeVar("VT")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of cache counters."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class TTLCache(Generic[KT, VT]):
+    """
+    Least recently used cache with time-to-live expiration.
+
+    Entries are evicted when the cache grows over maxsize or once their ttl (in seconds) has passed.
+    A cache created with maxsize of zero stores nothing.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._data: OrderedDict[KT, tuple[VT, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: KT, default: Any = None) -> VT | Any:
+        """Returns cached value or default if key is missing or expired."""
+
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: KT, value: VT, ttl: float | None = None) -> None:
+        """Stores value, evicting least recently used entries if needed. A shorter ttl may be given for the entry."""
+
+        if self.maxsize <= 0:
+            return
+
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl)))
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: KT) -> None:
+        """Removes key from the cache if present."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all entries, counters are kept."""
+        self._data.clear()
+
+    def stats(self) -> CacheStats:
+        """Returns current counters."""
+        return CacheStats(
+            hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._data), maxsize=self.maxsize
+        )
+
+
+link_cache: TTLCache[str, LinkOut] = TTLCache(maxsize=settings.LINK_CACHE_SIZE, ttl=settings.LINK_CACHE_TTL)
+
+# principals are cached for no longer than an access token lives
+principal_cache: TTLCache[int, UserInDB] = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=min(settings.PRINCIPAL_CACHE_TTL, settings.JWT_ACCESS_TOKEN_EXPIRY * 60)
+)
+
+
+def _collect_stats() -> dict[str, CacheStats]:
+    return {"link": link_cache.stats(), "principal": principal_cache.stats()}
+
+
+registry.register(
+    CollectedMetric(
+        "cache_lookups_total",
+        "Number of in-process cache lookups.",
+        "counter",
+        ("cache", "result"),
+        lambda: {
+            (name, result): value
+            for name, stats in _collect_stats().items()
+            for result, value in (("hit", stats.hits), ("miss", stats.misses))
+        },
+    )
+)
+registry.register(
+    CollectedMetric(
+        "cache_evictions_total",
+        "Number of entries evicted from in-process caches to make room.",
+        "counter",
+        ("cache",),
+        lambda: {(name,): stats.evictions for name, stats in _collect_stats().items()},
+    )
+)
+registry.register(
+    CollectedMetric(
+        "cache_entries",
+        "Number of entries in in-process caches.",
+        "gauge",
+        ("cache",),
+        lambda: {(name,): stats.size for name, stats in _collect_stats().items()},
+    )
+)
@@ -3,7 +3,9 @@ This module contains configuration variables for the application.
 Requires environment variables to be set before app start.
 """
 
-from pydantic import BaseSettings
+from typing import Optional
+
+from pydantic import BaseSettings, validator
 
 
 class AppSettings(BaseSettings):
@@ -21,16 +23,95 @@ class AppSettings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: int
 
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    DATABASE_REPLICA_MAX_LAG: float = 5.0
+    DATABASE_REPLICA_CHECK_INTERVAL: float = 5.0
+    DATABASE_REPLICA_CONNECT_TIMEOUT: float = 1.0
+
+    DATABASE_ECHO: bool = False
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    DATABASE_POOL_RECYCLE: int = 30 * 60
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_STATEMENT_CACHE_SIZE: int = 500
+    DATABASE_POOL_WARM_CONNECTIONS: int = 5
+
+    METRICS_ENABLED: bool = True
+
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRY: int = 25
     JWT_REFRESH_TOKEN_EXPIRY: int = 60 * 60 * 20
 
+    HASHER_WORKERS: int = 2
+    HASHER_MAX_PENDING: int = 64
+
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL: int = 60
+
+    LINK_CACHE_SIZE: int = 10_000
+    LINK_CACHE_TTL: int = 60
+    LINK_CACHE_PREWARM_KEYS: int = 1000
+    LINK_CACHE_PREWARM_HOURS: int = 24
+
+    SHARED_LINK_TABLE_PATH: Optional[str] = None
+    SHARED_LINK_TABLE_SLOTS: int = 65_536
+    SHARED_LINK_TABLE_URL_SIZE: int = 480
+
+    KEY_FILTER_ENABLED: bool = False
+    KEY_FILTER_CAPACITY: int = 10_000_000
+    KEY_FILTER_ERROR_RATE: float = 0.01
+    KEY_FILTER_REBUILD_INTERVAL: float = 60 * 60
+    KEY_FILTER_BUILD_BATCH_SIZE: int = 10_000
+    KEY_FILTER_CEILING_INTERVAL: float = 10.0
+    KEY_FILTER_CEILING_BLOCKS: int = 100
+
+    REDIRECT_STATUS_CODE: int = 307
+
+    LINK_ID_REFILL_THRESHOLD: int = 100
+    LINK_ID_BLOCK_LEASE: float = 10 * 60
+    LINK_BATCH_MAX_SIZE: int = 1000
+    LINK_DEDUPLICATION: bool = False
+
+    LINKS_PAGE_DEFAULT_LIMIT: int = 100
+    LINKS_PAGE_MAX_LIMIT: int = 1000
+    LINKS_FAST_SERIALIZATION: bool = False
+
+    LINK_EXPORT_BATCH_SIZE: int = 1000
+
+    VIEW_COUNTER_FLUSH_INTERVAL: float = 5.0
+    VIEW_COUNTER_MAX_KEYS: int = 10_000
+
+    LINK_EXPIRY_SWEEP_INTERVAL: float = 60.0
+    LINK_EXPIRY_SWEEP_BATCH_SIZE: int = 1000
+
+    STARTUP_WARM_UP_TIMEOUT: float = 10.0
+    SHUTDOWN_TIMEOUT: float = 25.0
+
+    # requests per second and burst by route name, token routes are limited per client ip, link routes per user
+    RATE_LIMITS: dict[str, tuple[float, int]] = {
+        "get_tokens": (5.0, 20),
+        "get_refresh_token": (5.0, 20),
+        "create_link": (20.0, 100),
+        "create_links_batch": (2.0, 10),
+    }
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
     CORS_ALLOW_CREDENTIALS: bool = True
     CORS_ALLOWED_ORIGINS: list[str] = ["*"]
     CORS_ALLOWED_METHODS: list[str] = ["*"]
     CORS_ALLOWED_HEADERS: list[str] = ["*"]
 
+    @validator("REDIRECT_STATUS_CODE")
+    @classmethod
+    def check_redirect_status_code(cls, value: int) -> int:
+        """Only permanent and temporary redirects are allowed."""
+        if value not in (301, 307, 308):
+            raise ValueError("REDIRECT_STATUS_CODE must be one of 301, 307, 308")
+        return value
+
     class Config:
         case_sensitive = True
         allow_mutation = False
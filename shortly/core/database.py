@@ -1,26 +1,206 @@
 """Database module wraps sqlalchemy api."""
 
-from typing import AsyncGenerator
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 
-from sqlalchemy import URL
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text, URL
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 
 from shortly.core.config import settings
+from shortly.core.metrics import instrument_engine, TimedQueuePool
 
-connection_uri = URL.create(
-    drivername="postgresql+asyncpg",
-    username=settings.POSTGRES_USER,
-    password=settings.POSTGRES_PASSWORD,
-    host=settings.POSTGRES_HOST,
-    port=settings.POSTGRES_PORT,
-    database=settings.POSTGRES_DB,
-)
 
-async_engine = create_async_engine(connection_uri, echo=True)
+def create_engine(host: str, port: int, name: str = "primary") -> AsyncEngine:
+    """Creates an engine for a database server with the configured pool profile, metrics are labelled by name."""
+
+    uri = URL.create(
+        drivername="postgresql+asyncpg",
+        username=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        host=host,
+        port=port,
+        database=settings.POSTGRES_DB,
+    )
+    metrics_options = {"poolclass": TimedQueuePool, "pool_logging_name": name} if settings.METRICS_ENABLED else {}
+    engine = create_async_engine(
+        uri,
+        echo=settings.DATABASE_ECHO,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE},
+        **metrics_options,
+    )
+    if settings.METRICS_ENABLED:
+        instrument_engine(engine, name)
+    return engine
+
+
+class ReplicaMonitor:
+    """
+    Tracks whether a read replica may serve queries.
+
+    The replica is usable while it answers and its replication lag stays within max_lag seconds.
+    The check runs at most once per check_interval, in between the last result is reused.
+    """
+
+    # a replica that has replayed everything it received is not lagging, however old the last transaction is
+    LAG_QUERY = text(
+        """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END
+        """
+    )
+
+    def __init__(self, engine: AsyncEngine, max_lag: float, check_interval: float) -> None:
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self.usable = False
+        self._checked_at = float("-inf")
+
+    async def is_usable(self) -> bool:
+        """Returns whether the replica is usable, checking it if the last result is outdated."""
+
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            # other requests keep using the previous result while the check runs
+            self._checked_at = now
+            self.usable = await self._check()
+        return self.usable
+
+    def mark_unusable(self) -> None:
+        """Stops using the replica until the next check."""
+        self.usable = False
+
+    async def _check(self) -> bool:
+        # the check runs within a request, so waiting for a checkout or an unreachable server is bounded too
+        try:
+            lag = await asyncio.wait_for(self._query_lag(), timeout=settings.DATABASE_REPLICA_CONNECT_TIMEOUT)
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError):
+            return False
+        return lag is not None and lag <= self.max_lag
+
+    async def _query_lag(self) -> float | None:
+        async with self.engine.connect() as connection:
+            return await connection.scalar(self.LAG_QUERY)
+
+
+async_engine = create_engine(settings.POSTGRES_HOST, settings.POSTGRES_PORT)
 async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
 
+replica_engine: AsyncEngine | None = None
+replica_session_factory: async_sessionmaker | None = None
+replica_monitor: ReplicaMonitor | None = None
+
+if settings.POSTGRES_REPLICA_HOST:
+    replica_engine = create_engine(
+        settings.POSTGRES_REPLICA_HOST, settings.POSTGRES_REPLICA_PORT or settings.POSTGRES_PORT, "replica"
+    )
+    replica_session_factory = async_sessionmaker(replica_engine, expire_on_commit=False, info={"replica": True})
+    replica_monitor = ReplicaMonitor(
+        replica_engine, settings.DATABASE_REPLICA_MAX_LAG, settings.DATABASE_REPLICA_CHECK_INTERVAL
+    )
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get session context."""
     async with async_session_factory() as session:
         yield session
+
+
+async def get_read_session_factory() -> async_sessionmaker:
+    """Returns session factory of the read replica while it is usable, otherwise the primary one."""
+
+    if replica_monitor is not None and await replica_monitor.is_usable():
+        return replica_session_factory
+    return async_session_factory
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Get session context for read-only queries, see read_session."""
+
+    async with read_session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Session context for read-only queries. Connection failures on the replica turn it off until next check.
+
+    A replica session connects before it is handed out, so requests that can not reach the replica
+    are served by the primary instead of failing.
+    """
+
+    session_factory = await get_read_session_factory()
+    async with session_factory() as session:
+        if not session.info.get("replica") or await _connect(session):
+            try:
+                yield session
+            except (InterfaceError, OperationalError, OSError):
+                if session.info.get("replica") and replica_monitor is not None:
+                    replica_monitor.mark_unusable()
+                raise
+            return
+
+    if replica_monitor is not None:
+        replica_monitor.mark_unusable()
+    async with async_session_factory() as session:
+        yield session
+
+
+async def _connect(session: AsyncSession) -> bool:
+    try:
+        await asyncio.wait_for(session.connection(), timeout=settings.DATABASE_REPLICA_CONNECT_TIMEOUT)
+    except (InterfaceError, OperationalError, OSError, asyncio.TimeoutError):
+        return False
+    return True
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> int:
+    """
+    Opens up to connections pooled connections at once and returns them to the pool,
+    so first requests do not pay for connecting. Returns the number of opened connections.
+    """
+
+    pending = [engine.connect() for _ in range(min(connections, engine.pool.size()))]
+    results = await asyncio.gather(*(connection.start() for connection in pending), return_exceptions=True)
+    await asyncio.gather(
+        *(connection.close() for connection, result in zip(pending, results) if not isinstance(result, BaseException))
+    )
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(pending)
+
+
+async def dispose_engines() -> None:
+    """Closes all pooled connections of the primary and replica engines."""
+
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
+def get_pool_stats() -> dict[str, int]:
+    """Returns connection pool utilization."""
+
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    }
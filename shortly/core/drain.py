@@ -0,0 +1,91 @@
+"""
+This module tracks requests in flight, so shutdown can stop taking new ones and wait for the rest.
+"""
+
+import asyncio
+import json
+
+
+class InFlightRequests:
+    """Number of requests being handled and whether new ones are still accepted."""
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.draining = False
+
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def start_draining(self) -> None:
+        """Stops accepting new requests."""
+        self.draining = True
+
+    def stop_draining(self) -> None:
+        """Accepts new requests again."""
+        self.draining = False
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Waits up to timeout seconds for requests in flight to finish, returns whether they all did."""
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def enter(self) -> None:
+        """Counts a new request."""
+
+        self.active += 1
+        self._idle.clear()
+
+    def leave(self) -> None:
+        """Counts a finished request."""
+
+        self.active -= 1
+        if not self.active:
+            self._idle.set()
+
+
+in_flight = InFlightRequests()
+
+
+class DrainMiddleware:
+    """
+    ASGI middleware counting requests in flight.
+
+    While draining, new requests are answered with 503 and the connection is closed,
+    so clients and load balancers retry them on another instance.
+    """
+
+    REJECTED_BODY = json.dumps({"detail": "Service is shutting down"}).encode()
+
+    def __init__(self, app, requests: InFlightRequests = in_flight) -> None:
+        self.app = app
+        self.requests = requests
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.requests.draining:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(self.REJECTED_BODY)).encode()),
+                        (b"connection", b"close"),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": self.REJECTED_BODY})
+            return
+
+        self.requests.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.requests.leave()
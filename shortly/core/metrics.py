@@ -0,0 +1,323 @@
+"""
+This module collects application metrics and renders them in Prometheus text format.
+
+Metrics are plain in-process counters, recording one costs a dictionary lookup and a few additions.
+With several worker processes every worker exposes its own metrics.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _format_labels(labelnames: tuple[str, ...], labels: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing value per set of labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        # a single element list per set of labels, so callers may keep it and increase it in place
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def labels(self, labels: tuple[str, ...]) -> list[float]:
+        """Returns the value cell of a set of labels."""
+
+        cell = self._values.get(labels)
+        if cell is None:
+            cell = self._values[labels] = [0]
+        return cell
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        """Increases the value of a set of labels."""
+        self.labels(labels)[0] += amount
+
+    def get(self, labels: tuple[str, ...] = ()) -> float:
+        """Returns the value of a set of labels."""
+        return self._values.get(labels, [0])[0]
+
+    def render(self) -> list[str]:
+        """Returns lines of the text format."""
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, (value,) in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets per set of labels."""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+
+        # per set of labels: count of every bucket and of +Inf, then the sum of values
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def labels(self, labels: tuple[str, ...]) -> list[float]:
+        """Returns the values of a set of labels, callers may keep them and pass them to observe_into."""
+
+        values = self._values.get(labels)
+        if values is None:
+            values = self._values[labels] = [0] * (len(self.buckets) + 2)
+        return values
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        """Records a value for a set of labels."""
+        self.observe_into(self.labels(labels), value)
+
+    def observe_into(self, values: list[float], value: float) -> None:
+        """Records a value into values of a set of labels."""
+
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def get_count(self, labels: tuple[str, ...] = ()) -> int:
+        """Returns the number of values observed for a set of labels."""
+
+        values = self._values.get(labels)
+        return int(sum(values[:-1])) if values else 0
+
+    def get_sum(self, labels: tuple[str, ...] = ()) -> float:
+        """Returns the sum of values observed for a set of labels."""
+
+        values = self._values.get(labels)
+        return values[-1] if values else 0
+
+    def render(self) -> list[str]:
+        """Returns lines of the text format."""
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, values in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class CollectedMetric:
+    """
+    Counter or gauge whose values are kept elsewhere and read at render time.
+
+    collect returns the value per set of labels, so code updating them does not depend on metrics.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        labelnames: Iterable[str],
+        collect: Callable[[], dict[tuple[str, ...], float]],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        """Returns lines of the text format."""
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics exposed together."""
+
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram | CollectedMetric] = []
+
+    def register(self, metric: Any) -> Any:
+        """Adds a metric and returns it."""
+
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Returns all metrics in Prometheus text format."""
+
+        return "".join(line + "\n" for metric in self._metrics for line in metric.render())
+
+
+registry = Registry()
+
+http_requests_total: Counter = registry.register(
+    Counter("http_requests_total", "Number of handled HTTP requests.", ("method", "route", "status"))
+)
+http_rate_limited_total: Counter = registry.register(
+    Counter("http_rate_limited_total", "Number of HTTP requests rejected by rate limits.", ("limit",))
+)
+http_request_duration_seconds: Histogram = registry.register(
+    Histogram("http_request_duration_seconds", "Duration of HTTP requests.", ("method", "route"))
+)
+http_request_db_queries: Histogram = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Number of database queries per HTTP request.",
+        ("method", "route"),
+        QUERY_COUNT_BUCKETS,
+    )
+)
+http_request_db_duration_seconds: Histogram = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds", "Time spent in database queries per HTTP request.", ("method", "route")
+    )
+)
+db_query_duration_seconds: Histogram = registry.register(
+    Histogram("db_query_duration_seconds", "Duration of database queries.", ("engine",))
+)
+db_pool_checkout_wait_seconds: Histogram = registry.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time waited for a pooled connection, including opening a new one.",
+        ("engine",),
+    )
+)
+
+# number of queries and seconds spent in them during the current request
+request_db_stats: ContextVar[list | None] = ContextVar("request_db_stats", default=None)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool recording how long checkouts wait, labelled by the pool logging name."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe((self._orig_logging_name or "",), time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Records duration of every query of an engine, and adds it to the current request."""
+
+    durations = db_query_duration_seconds.labels((name,))
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context.query_started
+        db_query_duration_seconds.observe_into(durations, duration)
+
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += duration
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording count, duration and database usage of HTTP requests.
+
+    Requests are labelled by route templates rather than paths, so short keys do not multiply series.
+    Requests that matched no route are labelled "unmatched".
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+        # per method and endpoint: request durations, query counts, query durations and counters by status
+        self._series: dict[tuple[str, Any], tuple[list[float], list[float], list[float], dict[int, list[float]]]] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = request_db_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            request_db_stats.reset(token)
+
+            key = (scope["method"], scope.get("endpoint"))
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = self._create_series(scope)
+            durations, query_counts, query_durations, counters = series
+
+            http_request_duration_seconds.observe_into(durations, duration)
+            http_request_db_queries.observe_into(query_counts, stats[0])
+            http_request_db_duration_seconds.observe_into(query_durations, stats[1])
+
+            counter = counters.get(status_code)
+            if counter is None:
+                counter = counters[status_code] = http_requests_total.labels(
+                    (scope["method"], self._route(scope), str(status_code))
+                )
+            counter[0] += 1
+
+    def _create_series(self, scope) -> tuple[list[float], list[float], list[float], dict[int, list[float]]]:
+        labels = (scope["method"], self._route(scope))
+        return (
+            http_request_duration_seconds.labels(labels),
+            http_request_db_queries.labels(labels),
+            http_request_db_duration_seconds.labels(labels),
+            {},
+        )
+
+    @staticmethod
+    def _route(scope) -> str:
+        # the router leaves the endpoint in the scope, its template is looked up once per series
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    return route.path
+        return "unmatched"
@@ -0,0 +1,125 @@
+"""
+This module records SQL statements executed within a block of code, usually a request.
+
+Recording is opt-in: statements are only seen once an engine is instrumented with enable,
+and only by logs opened with track_queries in the current context.
+"""
+
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog:
+    """Statements executed and rows fetched while the log was open."""
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+        self.rows = 0
+
+    @property
+    def count(self) -> int:
+        """Number of executed statements."""
+        return len(self.statements)
+
+    def repeated(self) -> dict[str, int]:
+        """
+        Returns statements executed more than once with the number of executions.
+        The same statement text run again and again with other parameters is a likely N+1 query.
+        """
+        return {statement: count for statement, count in Counter(self.statements).items() if count > 1}
+
+
+# logs open in the current context, nested blocks record into all of them
+_open_logs: ContextVar[tuple[QueryLog, ...]] = ContextVar("open_query_logs", default=())
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    """Opens a query log for the enclosed block."""
+
+    log = QueryLog()
+    token = _open_logs.set(_open_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _open_logs.reset(token)
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    logs = _open_logs.get()
+    if not logs:
+        return
+
+    # rows of server-side cursors are not known up front and are not counted
+    rows = cursor.rowcount if cursor.description is not None and cursor.rowcount > 0 else 0
+    for log in logs:
+        log.statements.append(statement)
+        log.rows += rows
+
+
+def is_enabled(engine: AsyncEngine) -> bool:
+    """Whether statements of an engine are recorded."""
+    return event.contains(engine.sync_engine, "after_cursor_execute", _record_statement)
+
+
+def enable(engine: AsyncEngine) -> None:
+    """Starts recording statements of an engine."""
+
+    if not is_enabled(engine):
+        event.listen(engine.sync_engine, "after_cursor_execute", _record_statement)
+
+
+def disable(engine: AsyncEngine) -> None:
+    """Stops recording statements of an engine."""
+
+    if is_enabled(engine):
+        event.remove(engine.sync_engine, "after_cursor_execute", _record_statement)
+
+
+class QueryLogMiddleware:
+    """
+    ASGI middleware adding statement counts of a request to its response headers.
+
+    x-db-queries and x-db-rows hold numbers of statements and fetched rows, x-db-repeated the number of
+    statements executed more than once, which are also logged as likely N+1 queries. Statements run after
+    the response has started, such as those of streamed responses, are not included in the headers.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as log:
+
+            async def send_with_headers(message) -> None:
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(log.count).encode()),
+                        (b"x-db-rows", str(log.rows).encode()),
+                        (b"x-db-repeated", str(len(log.repeated())).encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
+
+        repeated = log.repeated()
+        if repeated:
+            logger.warning(
+                "%s %s executed %d statements more than once, likely N+1 queries: %s",
+                scope["method"],
+                scope["path"],
+                len(repeated),
+                list(repeated),
+            )
@@ -0,0 +1,71 @@
+"""This module provides in-memory token bucket rate limiting."""
+
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+from .config import settings
+
+
+class TokenBuckets:
+    """
+    Token bucket per key, refilled at rate tokens per second up to burst tokens.
+
+    Buckets are kept in least recently used order. A bucket that has refilled completely is the same
+    as a missing one, so idle buckets are dropped from the old end as new keys come in. At most max_keys
+    buckets are kept. While all of them are still refilling, new keys share a single overflow bucket,
+    so a flood of new keys cannot reset the limits of active ones. Every call costs O(1) amortized.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+
+        # per key: tokens left and when they were counted
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict()
+        # shared by new keys while there is no room for their own buckets
+        self._overflow: list[float] | None = None
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable) -> float:
+        """Takes a token of a key. Returns zero on success, otherwise seconds until a token is available."""
+
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            self._buckets.move_to_end(key)
+        else:
+            self._evict(now)
+            if len(self._buckets) < self.max_keys:
+                bucket = self._buckets[key] = [self.burst, now]
+            elif self._overflow is None:
+                bucket = self._overflow = [self.burst, now]
+            else:
+                bucket = self._overflow
+
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        if bucket[0] < 1:
+            return (1 - bucket[0]) / self.rate
+
+        bucket[0] -= 1
+        return 0
+
+    def _evict(self, now: float) -> None:
+        # keys are ordered by last use, so scanning stops at the first bucket that is still refilling
+        while self._buckets:
+            tokens, updated_at = next(iter(self._buckets.values()))
+            if tokens + (now - updated_at) * self.rate < self.burst:
+                break
+            self._buckets.popitem(last=False)
+
+
+# limits by route name, routes without one are not limited
+rate_limiters: dict[str, TokenBuckets] = {
+    name: TokenBuckets(rate, burst, settings.RATE_LIMIT_MAX_KEYS)
+    for name, (rate, burst) in settings.RATE_LIMITS.items()
+}
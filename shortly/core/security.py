@@ -1,7 +1,10 @@
 """This module provides functions for hashing and verifying passwords and token encode/decode."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import Callable
 
 from jose import jwt, JWTError
 from jose.exceptions import ExpiredSignatureError, JWTClaimsError
@@ -19,11 +22,34 @@ class TokenType(str, Enum):
     REFRESH = "refresh_token"
 
 
+class HasherBusy(Exception):
+    """Raised when too many passwords are waiting to be hashed or verified."""
+
+
 class Hasher:
-    """Hashing utility."""
+    """
+    Hashing utility.
+
+    Async variants run bcrypt in a bounded thread pool, so hashing does not block the event loop.
+    At most max_pending calls may wait for the pool, later ones are rejected with HasherBusy.
+    """
 
     hash_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+    executor = ThreadPoolExecutor(max_workers=settings.HASHER_WORKERS, thread_name_prefix="hasher")
+    max_pending = settings.HASHER_MAX_PENDING
+    pending = 0
+
+    @staticmethod
+    def start() -> None:
+        """Replaces the hashing pool, so hashing works again after stop."""
+        Hasher.executor = ThreadPoolExecutor(max_workers=settings.HASHER_WORKERS, thread_name_prefix="hasher")
+
+    @staticmethod
+    def stop() -> None:
+        """Shuts the hashing pool down without waiting for running calls."""
+        Hasher.executor.shutdown(wait=False)
+
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Generate hash value."""
@@ -34,6 +60,27 @@ class Hasher:
         """Verify hash value."""
         return Hasher.hash_context.verify(original_password, hashed_password)
 
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """Generate hash value in the hashing pool."""
+        return await Hasher._run_in_executor(Hasher.get_password_hash, password)
+
+    @staticmethod
+    async def verify_password_async(original_password: str, hashed_password: str) -> bool:
+        """Verify hash value in the hashing pool."""
+        return await Hasher._run_in_executor(Hasher.verify_password, original_password, hashed_password)
+
+    @staticmethod
+    async def _run_in_executor(func: Callable, *args):
+        if Hasher.pending >= Hasher.max_pending:
+            raise HasherBusy()
+
+        Hasher.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(Hasher.executor, func, *args)
+        finally:
+            Hasher.pending -= 1
+
 
 def generate_token(token_type: TokenType, user_id: int) -> str:
     """Creates access or refresh token."""
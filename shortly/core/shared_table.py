@@ -0,0 +1,218 @@
+"""
+This module provides a key to url table in shared memory.
+
+All worker processes on a host map the same file, so a link cached by one worker is seen by all of them
+and an invalidation made by one worker is immediately visible to the others.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Iterator
+
+from .config import settings
+from .metrics import registry, CollectedMetric
+
+
+class SharedLinkTable:
+    """
+    Fixed-slot hash table of short key to original url in a memory-mapped file.
+
+    Keys are placed by crc32 with up to MAX_PROBES linear probes, when all of them are taken
+    the first one is overwritten. Urls longer than url_size bytes are not stored. A url may be stored
+    with an expiry time, after it the key is treated as missing. Entries stored more than ttl seconds ago
+    are treated as missing too, so a fill that raced with an invalidation does not outlive the ttl.
+
+    Reads take no lock. Every slot starts with a version counter that writers make odd while
+    they change the slot and even again when done, a reader that sees an odd or changed version
+    retries and finally treats the slot as a miss. Writers are serialized with a lock on the file.
+    """
+
+    MAGIC = b"SHRTLY03"
+    FILE_HEADER = struct.Struct("<8sII")
+    FILE_HEADER_SIZE = 64
+
+    # version, key length, key, url length, expiry time in seconds since the epoch or zero, time of the fill
+    SLOT_HEADER = struct.Struct("<QB7sHII6x")
+    VERSION = struct.Struct("<Q")
+
+    MAX_PROBES = 4
+    READ_ATTEMPTS = 3
+
+    def __init__(self, path: str, slots: int, url_size: int, ttl: float) -> None:
+        self.path = path
+        self.slots = slots
+        self.url_size = url_size
+        self.ttl = ttl
+        self.slot_size = self.SLOT_HEADER.size + url_size
+
+        self.hits = 0
+        self.misses = 0
+
+        size = self.FILE_HEADER_SIZE + slots * self.slot_size
+        header = self.FILE_HEADER.pack(self.MAGIC, slots, url_size)
+
+        self._fd = self._open_locked(path)
+        try:
+            file_size = os.fstat(self._fd).st_size
+            if not file_size:
+                self._initialize(self._fd, size, header)
+            elif file_size != size or os.pread(self._fd, len(header), 0) != header:
+                # a table of another layout may still be mapped by older processes,
+                # it is replaced by a new file instead of being resized under them
+                temporary_path = f"{path}.{os.getpid()}"
+                temporary_fd = os.open(temporary_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+                self._initialize(temporary_fd, size, header)
+                os.replace(temporary_path, path)
+                # closing the old descriptor releases the lock taken on it
+                os.close(self._fd)
+                self._fd = temporary_fd
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    def get(self, key: str) -> str | None:
+        """Returns original url of a key or None."""
+
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> tuple[str, int | None] | None:
+        """Returns original url of a key with its expiry time or None."""
+
+        encoded_key = key.encode()
+        for offset in self._probe(encoded_key):
+            slot = self._read(offset)
+            if slot is not None and slot[0] == encoded_key:
+                now = time.time()
+                if (slot[2] and slot[2] <= now) or slot[3] + self.ttl <= now:
+                    break
+                self.hits += 1
+                return slot[1].decode(), slot[2] or None
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, original_url: str, expires_at: float | None = None) -> None:
+        """Stores original url of a key, optionally until expires_at seconds since the epoch."""
+
+        encoded_key = key.encode()
+        encoded_url = original_url.encode()
+        if len(encoded_key) > 7 or len(encoded_url) > self.url_size:
+            return
+
+        with self._lock():
+            offsets = list(self._probe(encoded_key))
+            target = None
+            for offset in offsets:
+                _, key_length, slot_key, _, _, _ = self.SLOT_HEADER.unpack_from(self._map, offset)
+                if key_length and slot_key[:key_length] == encoded_key:
+                    target = offset
+                    break
+                if not key_length and target is None:
+                    target = offset
+
+            self._write(offsets[0] if target is None else target, encoded_key, encoded_url, int(expires_at or 0))
+
+    def invalidate(self, key: str) -> None:
+        """Removes a key from the table for all processes."""
+
+        encoded_key = key.encode()
+        with self._lock():
+            for offset in self._probe(encoded_key):
+                _, key_length, slot_key, _, _, _ = self.SLOT_HEADER.unpack_from(self._map, offset)
+                if key_length and slot_key[:key_length] == encoded_key:
+                    self._write(offset, b"", b"", 0)
+
+    def close(self) -> None:
+        """Unmaps the table, the file is left for other processes."""
+        self._map.close()
+        os.close(self._fd)
+
+    @staticmethod
+    def _open_locked(path: str) -> int:
+        # the file may be replaced while waiting for the lock, then the lock is taken on the new file instead
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    @staticmethod
+    def _initialize(fd: int, size: int, header: bytes) -> None:
+        os.ftruncate(fd, size)
+        os.pwrite(fd, header, 0)
+
+    def _probe(self, encoded_key: bytes) -> Iterator[int]:
+        start = zlib.crc32(encoded_key)
+        for probe in range(min(self.MAX_PROBES, self.slots)):
+            yield self.FILE_HEADER_SIZE + ((start + probe) % self.slots) * self.slot_size
+
+    def _read(self, offset: int) -> tuple[bytes, bytes, int, int] | None:
+        for _ in range(self.READ_ATTEMPTS):
+            version, key_length, key, url_length, expires_at, filled_at = self.SLOT_HEADER.unpack_from(
+                self._map, offset
+            )
+            if version & 1:
+                continue
+
+            url_offset = offset + self.SLOT_HEADER.size
+            url = self._map[url_offset : url_offset + url_length]
+
+            if self.VERSION.unpack_from(self._map, offset)[0] == version:
+                return (key[:key_length], url, expires_at, filled_at) if key_length else None
+        return None
+
+    def _write(self, offset: int, encoded_key: bytes, encoded_url: bytes, expires_at: int) -> None:
+        (version,) = self.VERSION.unpack_from(self._map, offset)
+
+        self.VERSION.pack_into(self._map, offset, version + 1)
+        url_offset = offset + self.SLOT_HEADER.size
+        self._map[url_offset : url_offset + len(encoded_url)] = encoded_url
+        self.SLOT_HEADER.pack_into(
+            self._map,
+            offset,
+            version + 1,
+            len(encoded_key),
+            encoded_key,
+            len(encoded_url),
+            expires_at,
+            int(time.time()) if encoded_key else 0,
+        )
+        self.VERSION.pack_into(self._map, offset, version + 2)
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+shared_link_table: SharedLinkTable | None = None
+if settings.SHARED_LINK_TABLE_PATH:
+    shared_link_table = SharedLinkTable(
+        settings.SHARED_LINK_TABLE_PATH,
+        settings.SHARED_LINK_TABLE_SLOTS,
+        settings.SHARED_LINK_TABLE_URL_SIZE,
+        settings.LINK_CACHE_TTL,
+    )
+
+    registry.register(
+        CollectedMetric(
+            "shared_link_table_lookups_total",
+            "Number of lookups in the link table shared by worker processes.",
+            "counter",
+            ("result",),
+            lambda: {("hit",): shared_link_table.hits, ("miss",): shared_link_table.misses},
+        )
+    )
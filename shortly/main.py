@@ -1,16 +1,100 @@
 """This module contains the main logic of the app."""
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from shortly.api.endpoints import api_router
+from shortly.api.metrics import router as metrics_router
+from shortly.api.redirect import router as redirect_router
+from shortly.core import query_log
 from shortly.core.config import settings
+from shortly.core.database import async_engine, async_session_factory, dispose_engines, replica_engine, warm_up_pool
+from shortly.core.drain import in_flight, DrainMiddleware
+from shortly.core.metrics import MetricsMiddleware
+from shortly.core.security import Hasher
+from shortly.repository.link import LinkRepository
+from shortly.service import link as link_service
+from shortly.service.counter import view_counter
+from shortly.service.expiry import link_expiry_sweeper
+from shortly.service.key_filter import key_filter_builder
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """Opens pooled connections and caches the most clicked links."""
+
+    engines = [engine for engine in (async_engine, replica_engine) if engine is not None]
+    await asyncio.gather(*(warm_up_pool(engine, settings.DATABASE_POOL_WARM_CONNECTIONS) for engine in engines))
+
+    if settings.LINK_CACHE_PREWARM_KEYS:
+        async with async_session_factory() as session:
+            cached = await link_service.prewarm_cache(
+                LinkRepository(session), settings.LINK_CACHE_PREWARM_KEYS, settings.LINK_CACHE_PREWARM_HOURS
+            )
+        logger.info("Cached %d most clicked links", cached)
+
+
+async def drain(timeout: float) -> None:
+    """
+    Stops taking requests, waits for those in flight, stops background workers, writes buffered views
+    and closes database connections, all within timeout seconds. Steps that run out of time are abandoned.
+    """
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    in_flight.start_draining()
+    if not await in_flight.wait_idle(deadline - loop.time()):
+        logger.warning("Shutting down with %d requests in flight", in_flight.active)
+
+    await key_filter_builder.stop()
+    await link_expiry_sweeper.stop()
+    try:
+        await asyncio.wait_for(view_counter.stop(), timeout=max(deadline - loop.time(), 0))
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Could not write %d buffered views", len(view_counter))
+    Hasher.stop()
+
+    try:
+        await asyncio.wait_for(dispose_engines(), timeout=max(deadline - loop.time(), 0))
+    except asyncio.TimeoutError:
+        logger.warning("Database connections were not closed within the shutdown timeout")
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI) -> AsyncIterator[None]:  # pylint: disable=unused-argument
+    """Warms the application up before it serves requests and drains it on shutdown."""
+
+    # a cold start is slower, but not a reason to refuse starting
+    try:
+        await asyncio.wait_for(warm_up(), timeout=settings.STARTUP_WARM_UP_TIMEOUT)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Warm-up did not finish")
+
+    # the app may be started again after a drain, e.g. by tests or an embedding server
+    Hasher.start()
+    in_flight.stop_draining()
+
+    view_counter.start()
+    link_expiry_sweeper.start()
+    if settings.KEY_FILTER_ENABLED:
+        key_filter_builder.start()
+
+    yield
+
+    await drain(settings.SHUTDOWN_TIMEOUT)
 
 
 def initialize_app() -> FastAPI:
     """Configurate FastAPI"""
 
-    api = FastAPI(debug=settings.DEBUG, title=settings.TITLE, version=settings.VERSION)
+    api = FastAPI(debug=settings.DEBUG, title=settings.TITLE, version=settings.VERSION, lifespan=lifespan)
 
     api.add_middleware(
         CORSMiddleware,
@@ -19,16 +103,22 @@ def initialize_app() -> FastAPI:
         allow_methods=settings.CORS_ALLOWED_METHODS,
         allow_headers=settings.CORS_ALLOWED_HEADERS,
     )
-
-    @api.on_event("startup")
-    async def startup() -> None:
-        pass
-
-    @api.on_event("shutdown")
-    async def shutdown() -> None:
-        pass
+    if settings.DEBUG:
+        # statement counts of every request in response headers
+        for engine in (async_engine, replica_engine):
+            if engine is not None:
+                query_log.enable(engine)
+        api.add_middleware(query_log.QueryLogMiddleware)
+    api.add_middleware(DrainMiddleware)
+    if settings.METRICS_ENABLED:
+        # added last, so it wraps everything else
+        api.add_middleware(MetricsMiddleware)
 
     api.include_router(api_router)
+    if settings.METRICS_ENABLED:
+        # before the redirect route, which would take "metrics" for a short key
+        api.include_router(metrics_router)
+    api.include_router(redirect_router)
 
     return api
 
@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import Callable, Optional, TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, func, String, Sequence
+from sqlalchemy import BigInteger, DateTime, ForeignKey, func, Index, String, Sequence
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -14,7 +14,10 @@ if TYPE_CHECKING:
 
     func: Callable
 
-links_id_seq = Sequence("links_id_seq", start=500_000)
+# every nextval reserves a block of ids, see shortly.service.allocator
+LINKS_ID_BLOCK_SIZE = 1000
+
+links_id_seq = Sequence("links_id_seq", start=500_000, increment=LINKS_ID_BLOCK_SIZE)
 
 
 class Link(Base):
@@ -31,5 +34,62 @@ class Link(Base):
     last_access_date: Mapped[datetime] = mapped_column(default=func.now())
     view_count: Mapped[int] = mapped_column(default=0)
     disabled: Mapped[bool] = mapped_column(default=False)
+    # hash of the normalized original url, only set for links subject to deduplication
+    url_hash: Mapped[Optional[int]] = mapped_column(BigInteger)
+
+    user: Mapped["User"] = relationship(back_populates="links", lazy="raise")
+
+
+# index-only lookups of enabled links by key
+Index(
+    "ix_links_short_key_enabled",
+    Link.short_key,
+    unique=True,
+    postgresql_where=Link.disabled.is_(False),
+    postgresql_include=["original_url", "expiry_date"],
+)
+
+# keyset pagination of enabled links of a user
+Index("ix_links_user_id_id", Link.user_id, Link.id, postgresql_where=Link.disabled.is_(False))
+
+# per user deduplication of links that never expire, see shortly.service.link.create
+Index(
+    "ix_links_user_id_url_hash",
+    Link.user_id,
+    Link.url_hash,
+    unique=True,
+    postgresql_where=Link.disabled.is_(False) & Link.expiry_date.is_(None),
+)
+
+# expiry sweeps only ever look at enabled links that expire
+Index(
+    "ix_links_expiry_date",
+    Link.expiry_date,
+    postgresql_where=Link.disabled.is_(False) & Link.expiry_date.is_not(None),
+)
+
+
+class LinkIdBlock(Base):
+    """
+    Represents 'link_id_blocks' database table, blocks of link ids reserved by allocators.
+    A block is only handed out for a limited time after its reservation, see shortly.service.allocator.
+    """
+
+    __tablename__ = "link_id_blocks"
+
+    start: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    reserved_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class LinkClicksHourly(Base):
+    """Represents 'link_clicks_hourly' database table, clicks of a link aggregated by hour."""
+
+    __tablename__ = "link_clicks_hourly"
+
+    link_id: Mapped[int] = mapped_column(ForeignKey("links.id", ondelete="CASCADE"), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
 
-    user: Mapped["User"] = relationship(back_populates="links", lazy="selectin")
+# startup cache prewarming sums recent clicks by link without reading older hours
+Index("ix_link_clicks_hourly_bucket", LinkClicksHourly.bucket, postgresql_include=["link_id", "count"])
@@ -27,4 +27,5 @@ class User(Base):
     disabled: Mapped[bool] = mapped_column(default=False)
     refresh_token: Mapped[str] = mapped_column(default="")
 
-    links: Mapped[list["Link"]] = relationship(back_populates="user", lazy="selectin")
+    # never loaded implicitly, links are fetched by LinkRepository where needed
+    links: Mapped[list["Link"]] = relationship(back_populates="user", lazy="raise")
@@ -8,3 +8,8 @@ class BaseRepository:
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
+
+    @property
+    def read_only(self) -> bool:
+        """Whether the session is bound to a read replica."""
+        return self.session.info.get("replica", False)
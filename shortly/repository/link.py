@@ -1,15 +1,43 @@
 """This module provides repository for link data."""
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import AsyncIterator
 
-from sqlalchemy import select
+from asyncpg.exceptions import IntegrityConstraintViolationError
+from sqlalchemy import (
+    bindparam,
+    column,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+    text,
+    update,
+    values,
+    DateTime,
+    Integer,
+    Interval,
+    Row,
+    String,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 
-from shortly.models.link import Link, links_id_seq
-from shortly.schemas.link import LinkInDB
+from shortly.core.bloom import key_filter
+from shortly.core.cache import link_cache
+from shortly.core.shared_table import shared_link_table
+from shortly.models.link import Link, LinkClicksHourly, LinkIdBlock, links_id_seq
+from shortly.schemas.link import Granularity, LinkInDB, LinkOut
 from .base import BaseRepository
 
 
+# most bind parameters PostgreSQL takes in a single statement
+MAX_BIND_PARAMS = 32767
+# batches of at least this many links are copied instead of inserted
+COPY_MIN_LINKS = 500
+
+
 class LinkDoesNotExists(Exception):
     """Raised when no appropriate link record found."""
 
@@ -18,14 +46,32 @@ class GenerationFailed(Exception):
     """Raised when no short key were created."""
 
 
+def _is_available():
+    """Condition of links that may be visited: enabled and not expired."""
+    return Link.disabled.is_(False) & (
+        Link.expiry_date.is_(None) | (Link.expiry_date > func.timezone("UTC", func.now()))
+    )
+
+
+def _invalidate_cached(link_key: str) -> None:
+    """Drops a link from the process cache and the shared table."""
+    link_cache.pop(link_key)
+    if shared_link_table is not None:
+        shared_link_table.invalidate(link_key)
+
+
 class LinkRepository(BaseRepository):
     """Repository responsible for CRUD operations on Links table."""
 
-    async def create(self, link_id: int, key: str, original_url: str, user_id: int) -> LinkInDB:
+    async def create(
+        self, link_id: int, key: str, original_url: str, user_id: int, expiry_date: datetime | None = None
+    ) -> LinkInDB:
         """Create link and store it in a database."""
 
         try:
-            db_link = Link(id=link_id, short_key=key, original_url=original_url, user_id=user_id)
+            db_link = Link(
+                id=link_id, short_key=key, original_url=original_url, user_id=user_id, expiry_date=expiry_date
+            )
 
             self.session.add(db_link)
             await self.session.commit()
@@ -34,14 +80,191 @@ class LinkRepository(BaseRepository):
             await self.session.rollback()
             raise GenerationFailed() from exc
 
+        key_filter.add(key)
         return db_link
 
-    async def get_id_from_sequence(self) -> int:
-        """Retrieves the next value from the links_id_seq sequence and returns it as an integer."""
+    async def create_or_get(self, link_id: int, key: str, original_url: str, user_id: int, url_hash: int) -> LinkInDB:
+        """
+        Create a link that never expires, unless the user already has an enabled one with the same url hash,
+        which is returned instead. Both cases take a single statement.
+        """
+
+        inserted = (
+            pg_insert(Link)
+            .values(id=link_id, short_key=key, original_url=original_url, user_id=user_id, url_hash=url_hash)
+            .on_conflict_do_nothing(
+                index_elements=[Link.user_id, Link.url_hash],
+                index_where=Link.disabled.is_(False) & Link.expiry_date.is_(None),
+            )
+            .returning(*Link.__table__.c)
+            .cte("inserted")
+        )
+        existing = select(*Link.__table__.c).where(
+            (Link.user_id == user_id)
+            & (Link.url_hash == url_hash)
+            & Link.disabled.is_(False)
+            & Link.expiry_date.is_(None)
+        )
+        statement = select(Link).from_statement(select(inserted).union_all(existing).limit(1))
+
+        # a duplicate committed after the statement started conflicts but is not selected, it is seen on retry
+        for _ in range(2):
+            try:
+                db_link = (await self.session.execute(statement)).scalar()
+                await self.session.commit()
+            except IntegrityError as exc:
+                await self.session.rollback()
+                raise GenerationFailed() from exc
+
+            if db_link is not None:
+                break
+        else:
+            raise GenerationFailed()
+
+        if db_link.short_key == key:
+            key_filter.add(key)
+        return db_link
+
+    async def create_many(self, links: list[tuple[int, str, str, datetime | None]], user_id: int) -> None:
+        """
+        Store several links given as (id, key, original url, expiry date). Smaller batches are sent as
+        multi-row inserts, split to stay within the bind parameter limit, larger ones are copied.
+        """
+
+        try:
+            if len(links) >= COPY_MIN_LINKS:
+                await self._copy_links(links, user_id)
+            else:
+                rows = [
+                    {
+                        "id": link_id,
+                        "short_key": key,
+                        "original_url": original_url,
+                        "user_id": user_id,
+                        "expiry_date": expiry_date,
+                    }
+                    for link_id, key, original_url, expiry_date in links
+                ]
+                # defaults are bound per row as well, so every column is counted
+                chunk_size = MAX_BIND_PARAMS // len(Link.__table__.c)
+                for start in range(0, len(rows), chunk_size):
+                    await self.session.execute(insert(Link).values(rows[start : start + chunk_size]))
+            await self.session.commit()
+        except (IntegrityError, IntegrityConstraintViolationError) as exc:
+            await self.session.rollback()
+            raise GenerationFailed() from exc
+
+        for _, key, _, _ in links:
+            key_filter.add(key)
+
+    async def _copy_links(self, links: list[tuple[int, str, str, datetime | None]], user_id: int) -> None:
+        # copy skips column defaults, they are filled in here the way an insert would
+        now = await self.session.scalar(select(func.localtimestamp()))
+        connection = await (await self.session.connection()).get_raw_connection()
+        await connection.driver_connection.copy_records_to_table(
+            Link.__tablename__,
+            records=[
+                (link_id, key, original_url, user_id, now, expiry_date, now, 0, False)
+                for link_id, key, original_url, expiry_date in links
+            ],
+            columns=[
+                "id",
+                "short_key",
+                "original_url",
+                "user_id",
+                "create_date",
+                "expiry_date",
+                "last_access_date",
+                "view_count",
+                "disabled",
+            ],
+        )
+
+    async def get_id_from_sequence(self, record: bool = False) -> int:
+        """
+        Retrieves the next value from the links_id_seq sequence and returns it as an integer.
+        The value is the first id of a block of LINKS_ID_BLOCK_SIZE reserved ids. With record, the reservation
+        is recorded in link_id_blocks by the same statement.
+        """
+
+        if not record:
+            results = await self.session.execute(select(links_id_seq.next_value()))
+            return results.scalar_one()
+
+        results = await self.session.execute(
+            insert(LinkIdBlock).from_select(["start"], select(links_id_seq.next_value())).returning(LinkIdBlock.start)
+        )
+        await self.session.commit()
+        return results.scalar_one()
 
-        results = await self.session.execute(select(links_id_seq.next_value()))
+    async def get_ids_from_sequence(self, count: int, record: bool = False) -> list[int]:
+        """Retrieves count next values from the links_id_seq sequence, and records them, in a single statement."""
+
+        next_values = select(links_id_seq.next_value()).select_from(func.generate_series(1, count))
+        if not record:
+            results = await self.session.execute(next_values)
+            return sorted(results.scalars())
+
+        results = await self.session.execute(
+            insert(LinkIdBlock).from_select(["start"], next_values).returning(LinkIdBlock.start)
+        )
+        await self.session.commit()
+        return sorted(results.scalars())
+
+    async def renew_id_block(self, start: int, window: timedelta) -> bool:
+        """
+        Records the block starting at start as reserved again, unless its record is older than window
+        and so may already be ignored. Returns whether the block was renewed.
+        """
+
+        results = await self.session.execute(
+            update(LinkIdBlock)
+            .where((LinkIdBlock.start == start) & (LinkIdBlock.reserved_at > func.now() - window))
+            .values(reserved_at=func.now())
+            .returning(LinkIdBlock.start)
+        )
+        await self.session.commit()
+        return results.scalar() is not None
+
+    async def get_sequence_last_value(self) -> int:
+        """Returns the last value of the links_id_seq sequence without advancing it."""
+
+        results = await self.session.execute(text(f"SELECT last_value FROM {links_id_seq.name}"))
+        return results.scalar_one()
+
+    async def get_id_watermark(self, window: timedelta) -> int:
+        """
+        Returns the lowest id that may still be handed out: the start of the earliest block reserved within window,
+        or the last value of the links_id_seq sequence if it is lower.
+        """
+
+        results = await self.session.execute(
+            text(
+                f"""
+                SELECT least(
+                    (SELECT last_value FROM {links_id_seq.name}),
+                    (SELECT min(start) FROM {LinkIdBlock.__tablename__} WHERE reserved_at > now() - :window)
+                )
+                """
+            ).bindparams(bindparam("window", window, type_=Interval))
+        )
         return results.scalar_one()
 
+    async def delete_id_blocks(self, window: timedelta) -> None:
+        """Deletes records of blocks reserved before window."""
+
+        await self.session.execute(delete(LinkIdBlock).where(LinkIdBlock.reserved_at <= func.now() - window))
+        await self.session.commit()
+
+    async def stream_keys(self, batch_size: int) -> AsyncIterator[list[str]]:
+        """Stream keys of all enabled links through a server-side cursor, batch_size keys at a time."""
+
+        results = await self.session.stream_scalars(
+            select(Link.short_key).where(Link.disabled.is_(False)).execution_options(yield_per=batch_size)
+        )
+        async for partition in results.partitions():
+            yield partition
+
     async def disable_by_key_and_user_id(self, link_key: str, user_id: int) -> None:
         """Disable already existing link by key and user id."""
 
@@ -56,24 +279,216 @@ class LinkRepository(BaseRepository):
         db_link.last_access_date = datetime.now()
         await self.session.commit()
 
-    async def get_all_by_user_id(self, user_id: int) -> list[LinkInDB]:
-        """Get all links by user id."""
+        _invalidate_cached(link_key)
 
-        results = await self.session.execute(select(Link).where((Link.user_id == user_id) & (Link.disabled.is_(False))))
+    async def disable_expired(self, batch_size: int) -> list[str]:
+        """
+        Disable at most batch_size expired links in a single statement and return their keys.
+        Links locked by other transactions are skipped and left for the next batch.
+        """
+
+        expired = (
+            select(Link.id)
+            .where(
+                Link.disabled.is_(False)
+                & Link.expiry_date.is_not(None)
+                & (Link.expiry_date <= func.timezone("UTC", func.now()))
+            )
+            .order_by(Link.expiry_date)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        results = await self.session.execute(
+            update(Link)
+            .where(Link.id.in_(expired))
+            .values(disabled=True, last_access_date=func.now())
+            .returning(Link.short_key)
+            .execution_options(synchronize_session=False)
+        )
+        keys = list(results.scalars())
+        await self.session.commit()
+
+        for key in keys:
+            _invalidate_cached(key)
+
+        return keys
+
+    async def get_all_by_user_id(self, user_id: int, limit: int, after_id: int | None = None) -> list[LinkInDB]:
+        """Get a page of links by user id ordered by id, starting after after_id."""
+
+        statement = select(Link).where((Link.user_id == user_id) & (Link.disabled.is_(False)))
+        if after_id is not None:
+            statement = statement.where(Link.id > after_id)
+
+        results = await self.session.execute(statement.order_by(Link.id).limit(limit))
         return results.scalars().all()
 
+    async def get_rows_by_user_id(self, user_id: int, limit: int, after_id: int | None = None) -> list[Row]:
+        """
+        Same page as get_all_by_user_id as plain (id, short_key, original_url, expiry_date) rows,
+        which skip building ORM objects.
+        """
+
+        statement = select(Link.id, Link.short_key, Link.original_url, Link.expiry_date).where(
+            (Link.user_id == user_id) & (Link.disabled.is_(False))
+        )
+        if after_id is not None:
+            statement = statement.where(Link.id > after_id)
+
+        results = await self.session.execute(statement.order_by(Link.id).limit(limit))
+        return results.all()
+
+    async def stream_all_by_user_id(self, user_id: int, batch_size: int) -> AsyncIterator[list[Row]]:
+        """
+        Stream statistics of all enabled links of a user through a server-side cursor.
+        Rows are fetched and yielded in lists of batch_size.
+        """
+
+        results = await self.session.stream(
+            select(
+                Link.original_url,
+                Link.short_key,
+                Link.create_date,
+                Link.expiry_date,
+                Link.last_access_date,
+                Link.view_count,
+                Link.disabled,
+            )
+            .where((Link.user_id == user_id) & (Link.disabled.is_(False)))
+            .order_by(Link.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in results.partitions():
+            yield partition
+
     async def get_by_key(self, link_key: str) -> LinkInDB | None:
-        """Get a link by short key and user id."""
+        """Get an enabled and not expired link by short key."""
+
+        results = await self.session.execute(select(Link).where((Link.short_key == link_key) & _is_available()))
+        return results.scalar()
+
+    async def get_url_by_key(self, link_key: str) -> LinkOut | None:
+        """
+        Get original url of an enabled and not expired link by short key.
+        Only columns included into ix_links_short_key_enabled are read, so the lookup is an index-only scan.
+        """
 
         results = await self.session.execute(
-            select(Link).where((Link.short_key == link_key) & (Link.disabled.is_(False)))
+            select(Link.short_key, Link.original_url, Link.expiry_date).where(
+                (Link.short_key == link_key) & _is_available()
+            )
         )
-        return results.scalar()
+        row = results.first()
+        return LinkOut.from_orm(row) if row else None
 
-    async def increase_view_counter_by_key(self, link_key: str) -> None:
-        """Increases link view counter by one."""
+    async def get_most_clicked(self, limit: int, since: datetime) -> list[LinkOut]:
+        """Get up to limit available links with the most clicks since a point in time, most clicked first."""
 
-        db_link = await self.get_by_key(link_key)
-        db_link.view_count += 1
+        # clicks are summed before the join, reading only recent hours of ix_link_clicks_hourly_bucket
+        recent = (
+            select(LinkClicksHourly.link_id, func.sum(LinkClicksHourly.count).label("clicks"))
+            .where(LinkClicksHourly.bucket >= since)
+            .group_by(LinkClicksHourly.link_id)
+            .subquery()
+        )
+        results = await self.session.execute(
+            select(Link.short_key, Link.original_url, Link.expiry_date)
+            .join(recent, recent.c.link_id == Link.id)
+            .where(_is_available())
+            .order_by(recent.c.clicks.desc())
+            .limit(limit)
+        )
+        return [LinkOut.from_orm(row) for row in results]
+
+    async def visit_by_key(self, link_key: str) -> LinkOut | None:
+        """
+        Increases view counter of an enabled and not expired link and returns it in a single statement.
+        If the session has no transaction in progress, the statement runs in autocommit mode.
+        """
+
+        statement = (
+            update(Link)
+            .where((Link.short_key == link_key) & _is_available())
+            .values(view_count=Link.view_count + 1, last_access_date=func.now())
+            .returning(Link.short_key, Link.original_url, Link.expiry_date)
+            .execution_options(synchronize_session=False)
+        )
+
+        if self.session.in_transaction():
+            results = await self.session.execute(statement)
+            await self.session.commit()
+        else:
+            connection = await self.session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            results = await connection.execute(statement)
+
+        row = results.first()
+        return LinkOut.from_orm(row) if row else None
+
+    async def increase_view_counters(self, counters: dict[str, int]) -> None:
+        """Increases view counters of several links by the given amounts in a single statement."""
+
+        if not counters:
+            return
+
+        increments = values(column("short_key", String), column("views", Integer), name="increments").data(
+            list(counters.items())
+        )
+        await self.session.execute(
+            update(Link)
+            .where(Link.short_key == increments.c.short_key)
+            .values(view_count=Link.view_count + increments.c.views, last_access_date=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+
+    async def record_clicks(self, clicks: dict[tuple[str, datetime], int]) -> None:
+        """Adds clicks given by (key, hour) to hourly buckets of the links in a single upsert."""
+
+        if not clicks:
+            return
 
+        increments = values(
+            column("short_key", String),
+            column("bucket", DateTime(timezone=True)),
+            column("clicks", Integer),
+            name="increments",
+        ).data([(key, bucket, count) for (key, bucket), count in clicks.items()])
+
+        statement = pg_insert(LinkClicksHourly).from_select(
+            ["link_id", "bucket", "count"],
+            select(Link.id, increments.c.bucket, increments.c.clicks).join_from(
+                increments, Link, Link.short_key == increments.c.short_key
+            ),
+        )
+        await self.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[LinkClicksHourly.link_id, LinkClicksHourly.bucket],
+                set_={"count": LinkClicksHourly.count + statement.excluded.count},
+            )
+        )
         await self.session.commit()
+
+    async def get_clicks(self, link_id: int, start: datetime, end: datetime, granularity: Granularity) -> list[Row]:
+        """
+        Get clicks of a link from start up to end summed by periods of granularity.
+        Periods are returned in order as (period, clicks) rows, periods without clicks are omitted.
+        """
+
+        # the unit is inlined, so the same expression is selected and grouped by
+        period = func.date_trunc(
+            literal_column(f"'{granularity.value}'"), func.timezone("UTC", LinkClicksHourly.bucket)
+        )
+        period = period.label("period")
+
+        results = await self.session.execute(
+            select(period, func.sum(LinkClicksHourly.count).label("clicks"))
+            .where(
+                (LinkClicksHourly.link_id == link_id)
+                & (LinkClicksHourly.bucket >= start)
+                & (LinkClicksHourly.bucket < end)
+            )
+            .group_by(period)
+            .order_by(period)
+        )
+        return results.all()
@@ -2,6 +2,7 @@
 
 from sqlalchemy import select
 
+from shortly.core.cache import principal_cache
 from shortly.core.security import Hasher
 from shortly.models.user import User
 from shortly.schemas.user import UserInDB
@@ -22,7 +23,7 @@ class UserRepository(BaseRepository):
 
     async def create(self, login: str, password: str) -> UserInDB:
         """Create user with login and password. Password is hashed inside."""
-        hashed_password = Hasher.get_password_hash(password)
+        hashed_password = await Hasher.get_password_hash_async(password)
 
         user = User(login=login, password=hashed_password)
         self.session.add(user)
@@ -43,11 +44,23 @@ class UserRepository(BaseRepository):
         user.refresh_token = ""
         await self.session.commit()
 
+        principal_cache.pop(user_id)
+
     async def get_by_id(self, user_id: int) -> UserInDB | None:
         """Returns user by provided user ID."""
         results = await self.session.execute(select(User).where((User.id == user_id) & (User.disabled.is_(False))))
         return results.scalar()
 
+    async def get_principal_by_id(self, user_id: int) -> UserInDB | None:
+        """Returns only the columns needed to authenticate a user, without loading an ORM entity."""
+        results = await self.session.execute(
+            select(User.id, User.login, User.create_at, User.disabled, User.refresh_token).where(
+                (User.id == user_id) & (User.disabled.is_(False))
+            )
+        )
+        row = results.first()
+        return UserInDB.from_orm(row) if row else None
+
     async def get_by_login(self, login: str) -> UserInDB | None:
         """Returns user by provided user login."""
         results = await self.session.execute(select(User).where((User.login == login) & (User.disabled.is_(False))))
@@ -59,7 +72,7 @@ class UserRepository(BaseRepository):
         if not user:
             raise UserDoesNotExists()
 
-        if not Hasher.verify_password(password, user.password):
+        if not await Hasher.verify_password_async(password, user.password):
             raise PasswordDoesNotMatch()
 
         return user
@@ -73,3 +86,5 @@ class UserRepository(BaseRepository):
 
         db_user.refresh_token = token
         await self.session.commit()
+
+        principal_cache.pop(user_id)
@@ -1,4 +1,4 @@
-"""This module defines a Pydantic schema for a Health object."""
+"""This module defines Pydantic schemas for Health objects."""
 
 from pydantic import BaseModel
 
@@ -10,3 +10,16 @@ class Health(BaseModel):
 
     class Config:
         schema_extra = {"example": {"status": "OK"}}
+
+
+class DatabasePool(BaseModel):
+    """A Pydantic model representing database connection pool utilization."""
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+
+    class Config:
+        schema_extra = {"example": {"size": 10, "checked_in": 2, "checked_out": 1, "overflow": -7, "max_overflow": 10}}
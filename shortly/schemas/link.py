@@ -1,17 +1,27 @@
 """This module defines a Pydantic schema for a Link object."""
 
-from datetime import datetime
-from typing import Optional, TYPE_CHECKING, TypeAlias
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Optional, TypeAlias
 
-from pydantic import AnyUrl, BaseModel, constr
-
-if TYPE_CHECKING:
-    from .user import UserInDB
+from pydantic import AnyUrl, BaseModel, constr, validator
 
 
 KeyType: TypeAlias = constr(min_length=4, max_length=7, regex=r"[^\W_]+$")
 
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class Granularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
 class LinkBase(BaseModel):
     original_url: AnyUrl
 
@@ -20,11 +30,28 @@ class LinkBase(BaseModel):
 
 
 class LinkIn(LinkBase):
-    pass
+    expiry_date: Optional[datetime]
+
+    @validator("expiry_date")
+    @classmethod
+    def check_expiry_date(cls, value: datetime | None) -> datetime | None:
+        """Expiry is stored as naive UTC, datetimes without a timezone are taken as UTC."""
+        if value is None:
+            return value
+
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if value <= datetime.now(timezone.utc).replace(tzinfo=None):
+            raise ValueError("expiry date must be in the future")
+        return value
+
+    class Config:
+        schema_extra = {"example": {"original_url": "http://example.com", "expiry_date": "2024-01-01T00:00:00"}}
 
 
 class LinkOut(LinkBase):
     short_key: KeyType
+    expiry_date: Optional[datetime]
 
     class Config:
         orm_mode = True
@@ -33,6 +60,41 @@ class LinkOut(LinkBase):
             "example": {
                 "original_url": "http://example.com",
                 "short_key": "hgrt67c",
+                "expiry_date": None,
+            }
+        }
+
+
+class LinkBatchIn(BaseModel):
+    links: list[dict[str, Any]]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "links": [
+                    {"original_url": "http://example.com"},
+                    {"original_url": "http://example.com", "expiry_date": "2024-01-01T00:00:00"},
+                    {"original_url": "example"},
+                ]
+            }
+        }
+
+
+class LinkBatchItemOut(BaseModel):
+    short_key: Optional[KeyType]
+    error: Optional[str]
+
+
+class LinkBatchOut(BaseModel):
+    links: list[LinkBatchItemOut]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "links": [
+                    {"short_key": "hgrt67c", "error": None},
+                    {"short_key": None, "error": "invalid or missing URL scheme"},
+                ]
             }
         }
 
@@ -61,11 +123,32 @@ class LinkStats(LinkBase):
         }
 
 
+class ClicksBucket(BaseModel):
+    bucket: datetime
+    clicks: int
+
+
+class LinkTimeseries(BaseModel):
+    short_key: KeyType
+    granularity: Granularity
+    buckets: list[ClicksBucket]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "short_key": "hgrt67c",
+                "granularity": "hour",
+                "buckets": [
+                    {"bucket": "2023-05-05T02:00:00+00:00", "clicks": 12},
+                    {"bucket": "2023-05-05T04:00:00+00:00", "clicks": 3},
+                ],
+            }
+        }
+
+
 class LinkInDB(LinkStats):
     id: int
     user_id: int
 
-    user: "UserInDB"
-
     class Config:
         orm_mode = True
@@ -1,13 +1,9 @@
 """This module defines a Pydantic schema for a User object."""
 
 from datetime import datetime
-from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, constr
 
-if TYPE_CHECKING:
-    from .link import LinkInDB, LinkOut
-
 
 class UserBase(BaseModel):
     login: constr(max_length=50)
@@ -27,12 +23,10 @@ class UserOut(BaseModel):
     create_at: datetime
     disabled: bool
 
-    links: list["LinkOut"] = []
-
     class Config:
         orm_mode = True
 
-        schema_extra = {"example": {"create_at": "2023-01-01T02:10:12.777785", "disabled": "False", "links": "[]"}}
+        schema_extra = {"example": {"create_at": "2023-01-01T02:10:12.777785", "disabled": "False"}}
 
 
 class UserInDB(UserBase):
@@ -42,7 +36,5 @@ class UserInDB(UserBase):
 
     refresh_token: str
 
-    links: list["LinkInDB"] = []
-
     class Config:
         orm_mode = True
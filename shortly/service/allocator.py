@@ -0,0 +1,127 @@
+"""This module contains hi-lo allocator of link ids."""
+
+import asyncio
+import math
+import time
+from datetime import timedelta
+
+from shortly.core.config import settings
+from shortly.core.database import async_session_factory
+from shortly.models.link import LINKS_ID_BLOCK_SIZE
+from shortly.repository.link import LinkRepository
+
+
+class IdBlockAllocator:
+    """
+    Hands out link ids from blocks reserved with a single sequence call.
+
+    Every nextval of links_id_seq reserves block_size consecutive ids for this process.
+    The next block is fetched in the background once fewer than refill_threshold ids are left.
+    With a lease, reserved blocks are recorded, so the key filter knows which blocks other processes
+    may still take ids from. A block is used for lease seconds, then its record is renewed, or if that
+    is too late, the rest of it is given up. Ids left in a block when the process exits or its lease ends
+    are never used, so ids may have gaps.
+    """
+
+    def __init__(self, block_size: int, refill_threshold: int, lease: float | None = None) -> None:
+        self.block_size = block_size
+        self.refill_threshold = refill_threshold
+        self.lease = lease
+
+        # current block is [_next, _end), it is used until _expires_at
+        self._next = 0
+        self._end = 0
+        self._expires_at = 0.0
+        self._pending: asyncio.Task[tuple[int, int, float]] | None = None
+
+    async def allocate(self) -> int:
+        """Returns next unused link id."""
+
+        while self._next >= self._end or time.monotonic() >= self._expires_at:
+            await self._switch_block()
+
+        link_id = self._next
+        self._next += 1
+
+        if self._end - self._next < self.refill_threshold and self._pending is None:
+            self._pending = asyncio.create_task(self._lease_block())
+
+        return link_id
+
+    async def allocate_many(self, count: int) -> list[int]:
+        """Returns count unused link ids. Missing blocks are reserved with a single sequence call."""
+
+        taken = min(count, self._end - self._next) if time.monotonic() < self._expires_at else 0
+        link_ids = list(range(self._next, self._next + taken))
+        self._next += taken
+
+        missing = count - taken
+        if missing <= 0:
+            return link_ids
+
+        expires_at = self._lease_end()
+        starts = await self._fetch_blocks(-(-missing // self.block_size))
+        for start in starts:
+            chunk = min(missing, self.block_size)
+            link_ids.extend(range(start, start + chunk))
+            missing -= chunk
+
+        # the rest of the last block becomes current one, unless another caller has switched blocks meanwhile
+        if chunk < self.block_size and self._next >= self._end:
+            self._next, self._end, self._expires_at = start + chunk, start + self.block_size, expires_at
+
+        return link_ids
+
+    async def _switch_block(self) -> None:
+        if self._pending is None:
+            self._pending = asyncio.create_task(self._lease_block())
+
+        pending = self._pending
+        try:
+            block = await asyncio.shield(pending)
+        except Exception:
+            if self._pending is pending:
+                self._pending = None
+            raise
+
+        # the first waiter to wake up takes the block, the others see it already switched
+        if self._pending is pending:
+            self._pending = None
+            self._next, self._end, self._expires_at = block
+
+    async def _lease_block(self) -> tuple[int, int, float]:
+        # the lease starts before the reservation is recorded, so it never outlasts the recorded one
+        expires_at = self._lease_end()
+
+        # an expired block with ids left is renewed rather than given up, unless its record may be ignored already
+        if self._next < self._end and time.monotonic() >= self._expires_at:
+            next_id, end = self._next, self._end
+            if await self._renew_block(end - self.block_size):
+                return next_id, end, expires_at
+
+        start = await self._fetch_block()
+        return start, start + self.block_size, expires_at
+
+    def _lease_end(self) -> float:
+        return time.monotonic() + self.lease if self.lease is not None else math.inf
+
+    async def _fetch_block(self) -> int:
+        async with async_session_factory() as session:
+            return await LinkRepository(session).get_id_from_sequence(record=self.lease is not None)
+
+    async def _fetch_blocks(self, count: int) -> list[int]:
+        async with async_session_factory() as session:
+            return await LinkRepository(session).get_ids_from_sequence(count, record=self.lease is not None)
+
+    async def _renew_block(self, start: int) -> bool:
+        # the key filter ignores records older than two leases
+        async with async_session_factory() as session:
+            return await LinkRepository(session).renew_id_block(start, timedelta(seconds=2 * self.lease))
+
+
+# blocks are only leased for the key filter
+link_id_allocator = IdBlockAllocator(
+    LINKS_ID_BLOCK_SIZE,
+    settings.LINK_ID_REFILL_THRESHOLD,
+    settings.LINK_ID_BLOCK_LEASE if settings.KEY_FILTER_ENABLED else None,
+)
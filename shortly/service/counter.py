@@ -0,0 +1,116 @@
+"""This module contains write-behind buffer for link view counters and hourly clicks."""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from shortly.core.config import settings
+from shortly.core.database import async_session_factory
+from shortly.repository.link import LinkRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounterBuffer:
+    """
+    Accumulates link views in memory and writes them to the database in batches.
+
+    Views are counted per link and per hour. Buffered views are flushed every flush_interval seconds,
+    as soon as max_keys distinct keys and hours are pending, and on stop. Each flush is a single bulk update
+    of view counters and a single upsert of hourly clicks.
+    """
+
+    def __init__(self, flush_interval: float, max_keys: int) -> None:
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+
+        self._counters: dict[str, int] = {}
+        # hours are kept as seconds since the epoch
+        self._clicks: dict[tuple[str, int], int] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._clicks)
+
+    def add(self, key: str, views: int = 1, counted: bool = False) -> None:
+        """Buffers views of a link. Views already counted in the links table are only recorded as clicks."""
+
+        if not counted:
+            self._counters[key] = self._counters.get(key, 0) + views
+
+        hour = int(time.time()) // 3600 * 3600
+        self._clicks[(key, hour)] = self._clicks.get((key, hour), 0) + views
+        if len(self._clicks) >= self.max_keys:
+            self._flush_requested.set()
+
+    async def flush(self) -> None:
+        """Writes all buffered views. On failure views are put back into the buffer."""
+
+        if not self._clicks:
+            return
+
+        counters, self._counters = self._counters, {}
+        clicks, self._clicks = self._clicks, {}
+        try:
+            async with async_session_factory() as session:
+                repo = LinkRepository(session)
+
+                await repo.increase_view_counters(counters)
+                counters = {}
+
+                await repo.record_clicks(
+                    {(key, datetime.fromtimestamp(hour, timezone.utc)): count for (key, hour), count in clicks.items()}
+                )
+        except BaseException:
+            # cancelled flushes put views back as well
+            for key, views in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + views
+            for key_hour, count in clicks.items():
+                self._clicks[key_hour] = self._clicks.get(key_hour, 0) + count
+            raise
+
+    def start(self) -> None:
+        """Starts periodic flushing in the background."""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops periodic flushing, waits for a flush in progress and writes what is left in the buffer."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            # stop cancels the loop, but a flush in progress is finished rather than interrupted
+            flush = asyncio.create_task(self._flush_logged())
+            try:
+                await asyncio.shield(flush)
+            except asyncio.CancelledError:
+                await flush
+                raise
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not flush %d buffered view counters", len(self._counters))
+
+
+view_counter = ViewCounterBuffer(settings.VIEW_COUNTER_FLUSH_INTERVAL, settings.VIEW_COUNTER_MAX_KEYS)
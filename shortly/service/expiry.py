@@ -0,0 +1,74 @@
+"""This module contains background sweeper of expired links."""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from shortly.core.config import settings
+from shortly.core.database import async_session_factory
+from shortly.repository.link import LinkRepository
+
+logger = logging.getLogger(__name__)
+
+
+class LinkExpirySweeper:
+    """
+    Disables expired links in the background.
+
+    Every interval seconds expired links are disabled batch_size at a time, each batch in its own short transaction,
+    until none are left. Lookups already ignore expired links, sweeping keeps the table and caches tidy.
+    Records of id blocks whose lease has ended, which the key filter no longer looks at, are deleted as well.
+    """
+
+    def __init__(self, interval: float, batch_size: int, id_block_lease: float = settings.LINK_ID_BLOCK_LEASE) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.id_block_lease = id_block_lease
+
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        """Disables all currently expired links and returns their number."""
+
+        disabled = 0
+        async with async_session_factory() as session:
+            repo = LinkRepository(session)
+            # the key filter ignores records older than two leases
+            await repo.delete_id_blocks(timedelta(seconds=2 * self.id_block_lease))
+
+            while True:
+                keys = await repo.disable_expired(self.batch_size)
+                disabled += len(keys)
+                if len(keys) < self.batch_size:
+                    return disabled
+
+    def start(self) -> None:
+        """Starts periodic sweeps in the background."""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops periodic sweeps."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                disabled = await self.sweep()
+                if disabled:
+                    logger.info("Disabled %d expired links", disabled)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Could not disable expired links")
+
+            await asyncio.sleep(self.interval)
+
+
+link_expiry_sweeper = LinkExpirySweeper(settings.LINK_EXPIRY_SWEEP_INTERVAL, settings.LINK_EXPIRY_SWEEP_BATCH_SIZE)
@@ -0,0 +1,112 @@
+"""This module contains periodic builder of the short key filter."""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from shortly.core.bloom import key_filter, KeyFilter
+from shortly.core.config import settings
+from shortly.core.database import async_session_factory
+from shortly.models.link import LINKS_ID_BLOCK_SIZE
+from shortly.repository.link import LinkRepository
+
+logger = logging.getLogger(__name__)
+
+
+class KeyFilterBuilder:
+    """
+    Keeps the key filter up to date.
+
+    The filter is built from the database on start and then every rebuild_interval seconds.
+    In between, every ceiling_interval seconds the ceiling is moved ceiling_blocks id blocks above
+    the current sequence value, so keys created by other processes are let through.
+
+    The watermark is the start of the earliest id block whose lease may not have ended yet.
+    Leases are counted twice over, a margin for requests that took an id just before the lease ended.
+    """
+
+    def __init__(
+        self,
+        target: KeyFilter,
+        rebuild_interval: float,
+        batch_size: int,
+        ceiling_interval: float = settings.KEY_FILTER_CEILING_INTERVAL,
+        ceiling_blocks: int = settings.KEY_FILTER_CEILING_BLOCKS,
+        id_block_lease: float = settings.LINK_ID_BLOCK_LEASE,
+    ) -> None:
+        self.target = target
+        self.rebuild_interval = rebuild_interval
+        self.batch_size = batch_size
+        self.ceiling_interval = ceiling_interval
+        self.ceiling_blocks = ceiling_blocks
+        self.id_block_lease = id_block_lease
+
+        self._task: asyncio.Task | None = None
+
+    async def build(self) -> None:
+        """Streams all enabled keys into a new filter and swaps it in."""
+
+        bloom_filter = self.target.begin_build()
+        try:
+            async with async_session_factory() as session:
+                repo = LinkRepository(session)
+
+                # ids handed out after this point and ids of still leased blocks are at or above the watermark
+                window = timedelta(seconds=2 * self.id_block_lease)
+                watermark = await repo.get_id_watermark(window)
+                last_value = await repo.get_sequence_last_value()
+                async for keys in repo.stream_keys(self.batch_size):
+                    for key in keys:
+                        bloom_filter.add(key)
+        except Exception:
+            self.target.abort_build()
+            raise
+
+        self.target.finish_build(watermark, self._ceiling(last_value))
+
+    async def update_ceiling(self) -> None:
+        """Moves the ceiling above the current sequence value."""
+
+        async with async_session_factory() as session:
+            last_value = await LinkRepository(session).get_sequence_last_value()
+        self.target.set_ceiling(self._ceiling(last_value))
+
+    def start(self) -> None:
+        """Starts periodic builds in the background."""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops periodic builds."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _ceiling(self, last_value: int) -> int:
+        return last_value + self.ceiling_blocks * LINKS_ID_BLOCK_SIZE
+
+    async def _run(self) -> None:
+        built_at = float("-inf")
+        while True:
+            try:
+                if time.monotonic() - built_at >= self.rebuild_interval:
+                    await self.build()
+                    built_at = time.monotonic()
+                else:
+                    await self.update_ceiling()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Could not update short key filter")
+
+            await asyncio.sleep(self.ceiling_interval)
+
+
+key_filter_builder = KeyFilterBuilder(
+    key_filter, settings.KEY_FILTER_REBUILD_INTERVAL, settings.KEY_FILTER_BUILD_BATCH_SIZE
+)
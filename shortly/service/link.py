@@ -1,9 +1,33 @@
 """This module contains link service."""
 
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import json
 import string
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+from urllib.parse import urlsplit, urlunsplit
 
-from shortly.schemas.link import LinkInDB
+from sqlalchemy import Row
+
+try:
+    import orjson
+except ImportError:  # optional, links are encoded with the standard json module without it
+    orjson = None
+
+from shortly.core.bloom import key_filter
+from shortly.core.cache import link_cache
+from shortly.core.config import settings
+from shortly.core.database import async_session_factory
+from shortly.core.shared_table import shared_link_table
+from shortly.schemas.link import ClicksBucket, Granularity, LinkIn, LinkInDB, LinkOut
 from shortly.repository.link import LinkRepository, GenerationFailed
+from .allocator import link_id_allocator
+from .counter import view_counter
 
 ALPHANUMERIC: str = string.digits + string.ascii_letters
 ALPHANUMERIC_LEN: int = len(ALPHANUMERIC)
@@ -26,15 +50,245 @@ def encode_base62(number: int) -> str:
     return encoded
 
 
-async def create(original_url: str, user_id: int, repo: LinkRepository) -> LinkInDB:
-    """Creates link."""
+def encode_cursor(link_id: int) -> str:
+    """Encodes id of the last link on a page into an opaque cursor."""
+    return base64.urlsafe_b64encode(str(link_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decodes cursor back into a link id. Raises ValueError if cursor is malformed."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def normalize_url(url: str) -> str:
+    """Lowercases scheme and host, drops default ports and adds an empty path, which leave the target unchanged."""
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+
+    userinfo, at, host = parts.netloc.rpartition("@")
+    host = host.lower()
+    default_port = {"http": ":80", "https": ":443"}.get(scheme)
+    if default_port and host.endswith(default_port):
+        host = host[: -len(default_port)]
+
+    return urlunsplit((scheme, userinfo + at + host, parts.path or "/", parts.query, parts.fragment))
 
-    link_id = await repo.get_id_from_sequence()
+
+def hash_url(url: str) -> int:
+    """Returns a signed 64 bit hash of the normalized url."""
+    return int.from_bytes(hashlib.blake2b(normalize_url(url).encode(), digest_size=8).digest(), "big", signed=True)
+
+
+async def create(
+    original_url: str, user_id: int, repo: LinkRepository, expiry_date: datetime | None = None
+) -> LinkInDB:
+    """
+    Creates link. With LINK_DEDUPLICATION, a link that never expires is only created if the user has
+    no enabled link to the same normalized url, otherwise that link is returned.
+    """
+
+    link_id = await link_id_allocator.allocate()
 
     key = encode_base62(link_id)
     try:
-        link = await repo.create(link_id, key, original_url, user_id)
+        if settings.LINK_DEDUPLICATION and expiry_date is None:
+            link = await repo.create_or_get(link_id, key, original_url, user_id, hash_url(original_url))
+            # another url with the same hash, the new link is created without one
+            if link.short_key != key and normalize_url(link.original_url) != normalize_url(original_url):
+                link = await repo.create(link_id, key, original_url, user_id)
+        else:
+            link = await repo.create(link_id, key, original_url, user_id, expiry_date)
     except GenerationFailed as exc:
         raise CreateLinkError() from exc
 
     return link
+
+
+async def create_many(new_links: list[LinkIn], user_id: int, repo: LinkRepository) -> list[str]:
+    """Creates several links at once and returns their keys in the same order."""
+
+    if not new_links:
+        return []
+
+    link_ids = await link_id_allocator.allocate_many(len(new_links))
+
+    links = [
+        (link_id, encode_base62(link_id), new_link.original_url, new_link.expiry_date)
+        for link_id, new_link in zip(link_ids, new_links)
+    ]
+    try:
+        await repo.create_many(links, user_id)
+    except GenerationFailed as exc:
+        raise CreateLinkError() from exc
+
+    return [key for _, key, _, _ in links]
+
+
+async def get(key: str, repo: LinkRepository) -> LinkInDB | None:
+    """Returns link by a key. Links missing on a read replica are looked up on the primary, it may lag behind."""
+
+    if not key_filter.might_exist(key):
+        return None
+
+    db_link = await repo.get_by_key(key)
+    if db_link is None and repo.read_only:
+        async with async_session_factory() as session:
+            db_link = await LinkRepository(session).get_by_key(key)
+
+    return db_link
+
+
+async def _resolve(key: str, repo: LinkRepository) -> LinkOut | None:
+    # same as get without the key filter, but reads only what a visit needs
+    link = await repo.get_url_by_key(key)
+    if link is None and repo.read_only:
+        async with async_session_factory() as session:
+            link = await LinkRepository(session).get_url_by_key(key)
+
+    return link
+
+
+def _get_cached(key: str) -> LinkOut | None:
+    # the table shared by all workers replaces the per-process cache when it is enabled
+    if shared_link_table is not None:
+        entry = shared_link_table.get_entry(key)
+        if entry is None:
+            return None
+
+        original_url, expires_at = entry
+        expiry_date = datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None) if expires_at else None
+        return LinkOut.construct(short_key=key, original_url=original_url, expiry_date=expiry_date)
+    return link_cache.get(key)
+
+
+def _set_cached(link: LinkOut) -> None:
+    # links are not cached past their expiry
+    expires_at = link.expiry_date.replace(tzinfo=timezone.utc).timestamp() if link.expiry_date else None
+
+    if shared_link_table is not None:
+        shared_link_table.set(link.short_key, link.original_url, expires_at)
+    elif expires_at is None:
+        link_cache.set(link.short_key, link)
+    else:
+        link_cache.set(link.short_key, link, ttl=expires_at - time.time())
+
+
+def visit_cached(key: str) -> LinkOut | None:
+    """Returns link by a key and counts the view if the link is cached, otherwise None."""
+
+    link = _get_cached(key)
+    if link is not None:
+        view_counter.add(key)
+    return link
+
+
+async def visit(key: str, repo: LinkRepository) -> LinkOut | None:
+    """
+    Returns link by a key and counts the view.
+
+    Cached links cost no database round-trip, their views are buffered. Otherwise the link is fetched
+    and its counter increased by a single statement. With a read replica, the link is read from it
+    and its view is buffered. Hourly clicks are always buffered.
+    """
+
+    link = visit_cached(key)
+    if link is not None:
+        return link
+
+    if not key_filter.might_exist(key):
+        return None
+
+    if repo.read_only:
+        link = await _resolve(key, repo)
+        if link is not None:
+            view_counter.add(key)
+    else:
+        link = await repo.visit_by_key(key)
+        if link is not None:
+            view_counter.add(key, counted=True)
+
+    if link is not None:
+        _set_cached(link)
+
+    return link
+
+
+async def prewarm_cache(repo: LinkRepository, limit: int, hours: int) -> int:
+    """Caches up to limit links clicked the most during the last hours, returns the number of cached links."""
+
+    links = await repo.get_most_clicked(limit, datetime.now(timezone.utc) - timedelta(hours=hours))
+    for link in links:
+        _set_cached(link)
+    return len(links)
+
+
+async def get_clicks(
+    link: LinkInDB, start: datetime | None, end: datetime | None, granularity: Granularity, repo: LinkRepository
+) -> list[ClicksBucket]:
+    """
+    Returns clicks of a link from start up to end by periods of granularity.
+    The range defaults to the last day, datetimes without a timezone are taken as UTC.
+    """
+
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise ValueError("Range start must be before its end")
+
+    rows = await repo.get_clicks(link.id, start, end, granularity)
+    return [ClicksBucket(bucket=period.replace(tzinfo=timezone.utc), clicks=clicks) for period, clicks in rows]
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_links(rows: list[Row]) -> bytes:
+    """
+    Encodes rows of get_rows_by_user_id into a json array of LinkOut objects, as FastAPI would render it.
+    Rows are taken as stored, without validation.
+    """
+
+    links = [
+        {"original_url": original_url, "short_key": short_key, "expiry_date": expiry_date}
+        for _, short_key, original_url, expiry_date in rows
+    ]
+    if orjson is not None:
+        return orjson.dumps(links)
+    return json.dumps(links, default=_to_json, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+async def export_ndjson(partitions: AsyncIterator[list[Row]]) -> AsyncIterator[str]:
+    """Serializes streamed link rows into newline delimited json, one chunk per partition."""
+
+    async for rows in partitions:
+        yield "".join(json.dumps(row._asdict(), default=_to_json) + "\n" for row in rows)
+
+
+async def export_csv(partitions: AsyncIterator[list[Row]]) -> AsyncIterator[str]:
+    """Serializes streamed link rows into csv with a header, one chunk per partition."""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    header_written = False
+    async for rows in partitions:
+        if not header_written:
+            writer.writerow(rows[0]._fields)
+            header_written = True
+
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+        buffer.seek(0)
+        buffer.truncate()
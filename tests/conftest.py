@@ -1,9 +1,14 @@
 import asyncio
+from contextlib import contextmanager
+from typing import Awaitable, Callable, ContextManager, Iterator
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 
+from shortly.core import query_log
 from shortly.core.database import async_engine
+from shortly.core.rate_limit import rate_limiters
 from shortly.models.base import Base
 from shortly.models.user import User
 from shortly.models.link import Link
@@ -33,5 +38,58 @@ async def setup_db():
 @pytest_asyncio.fixture(scope="session")
 async def setup_client(setup_db):
     """Global app fixture."""
+
+    # tests share a client ip and users, rate limit tests set their own limits
+    rate_limiters.clear()
+
     async with AsyncClient(app=app, base_url="http://localhost") as client:
         yield client
+
+
+@pytest_asyncio.fixture(scope="session")
+async def auth_headers(setup_client: AsyncClient) -> Callable[[str], Awaitable[dict[str, str]]]:
+    """
+    Registers a user and returns authorization headers with an access token of that user:
+
+        headers = await auth_headers("new_test_user_a2")
+    """
+
+    client = setup_client
+
+    async def register(login: str) -> dict[str, str]:
+        await client.post("api/users", json={"login": login, "password": "super_secure_password"})
+        response = await client.post(
+            "api/token", data={"username": login, "password": "super_secure_password", "grant_type": "password"}
+        )
+        return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+    return register
+
+
+@pytest.fixture
+def query_budget() -> Iterator[Callable[..., ContextManager[query_log.QueryLog]]]:
+    """
+    Asserts that a block of code stays within a number of SQL statements:
+
+        with query_budget(1):
+            await client.get("api/links/abcd")
+
+    Statements repeated within the block fail it as likely N+1 queries, unless allow_repeated is set.
+    """
+
+    was_enabled = query_log.is_enabled(async_engine)
+    query_log.enable(async_engine)
+
+    @contextmanager
+    def budget(max_queries: int, allow_repeated: bool = False) -> Iterator[query_log.QueryLog]:
+        with query_log.track_queries() as log:
+            yield log
+
+        statements = "\n".join(log.statements)
+        assert log.count <= max_queries, f"{log.count} statements over budget of {max_queries}:\n{statements}"
+        assert allow_repeated or not log.repeated(), f"Repeated statements, likely N+1 queries:\n{statements}"
+
+    yield budget
+
+    if not was_enabled:
+        query_log.disable(async_engine)
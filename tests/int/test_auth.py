@@ -2,6 +2,8 @@ import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 
+from shortly.core.rate_limit import rate_limiters, TokenBuckets
+
 
 @pytest_asyncio.fixture(scope="module")
 async def setup_user_for_auth(setup_client: AsyncClient) -> None:
@@ -52,3 +54,19 @@ async def test_auth_refresh_token(setup_client: AsyncClient, setup_user_for_auth
 
     response = await client.post("api/refresh-token")
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_auth_rate_limit(setup_client: AsyncClient, setup_user_for_auth: None, monkeypatch: pytest.MonkeyPatch):
+    client = setup_client
+
+    monkeypatch.setitem(rate_limiters, "get_tokens", TokenBuckets(rate=0.1, burst=2, max_keys=10))
+
+    form = {"username": "unvalid_user", "password": "super_secure_password", "grant_type": "password"}
+    for _ in range(2):
+        response = await client.post("api/token", data=form)
+        assert response.status_code == 401
+
+    response = await client.post("api/token", data=form)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "10"
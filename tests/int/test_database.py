@@ -0,0 +1,105 @@
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from shortly.core.cache import link_cache
+from shortly.core.config import settings
+from shortly.core.database import async_engine, create_engine, ReplicaMonitor
+from shortly.service.counter import view_counter
+
+
+@pytest_asyncio.fixture
+async def setup_replica(setup_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> ReplicaMonitor:
+    """Uses the primary database as its own read replica."""
+
+    monitor = ReplicaMonitor(async_engine, max_lag=1, check_interval=60)
+    replica_session_factory = async_sessionmaker(async_engine, expire_on_commit=False, info={"replica": True})
+
+    monkeypatch.setattr("shortly.core.database.replica_monitor", monitor)
+    monkeypatch.setattr("shortly.core.database.replica_session_factory", replica_session_factory)
+
+    yield monitor
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor(setup_client: AsyncClient):
+    monitor = ReplicaMonitor(async_engine, max_lag=1, check_interval=60)
+    assert await monitor.is_usable()
+
+    monitor.mark_unusable()
+    assert not await monitor.is_usable()
+
+    unreachable_engine = create_engine("localhost", 1)
+    monitor = ReplicaMonitor(unreachable_engine, max_lag=1, check_interval=60)
+    assert not await monitor.is_usable()
+    await unreachable_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_reads(setup_client: AsyncClient, setup_replica: ReplicaMonitor, auth_headers):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_f1")
+
+    response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=headers)
+    short_key = response.json()["short_key"]
+
+    link_cache.clear()
+    response = await client.get(f"api/links/{short_key}")
+    assert response.status_code == 200
+    assert setup_replica.usable
+
+    response = await client.get("api/links", headers=headers)
+    assert response.status_code == 200
+    assert [link["short_key"] for link in response.json()] == [short_key]
+
+    await view_counter.flush()
+
+    response = await client.get(f"api/links/{short_key}/stats")
+    assert response.status_code == 200
+    assert response.json()["view_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replica_unreachable(
+    setup_client: AsyncClient, setup_replica: ReplicaMonitor, monkeypatch: pytest.MonkeyPatch
+):
+    client = setup_client
+
+    response = await client.get("api/links/abcd/stats")
+    assert setup_replica.usable
+
+    # requests that can not reach the replica fall back to the primary
+    unreachable_engine = create_engine("localhost", 1)
+    replica_session_factory = async_sessionmaker(unreachable_engine, expire_on_commit=False, info={"replica": True})
+    monkeypatch.setattr("shortly.core.database.replica_session_factory", replica_session_factory)
+
+    response = await client.get("api/links/abcd/stats")
+    assert response.status_code == 404
+    assert not setup_replica.usable
+
+    await unreachable_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_unreachable_redirect(
+    setup_client: AsyncClient, setup_replica: ReplicaMonitor, auth_headers, monkeypatch: pytest.MonkeyPatch
+):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_f2")
+    response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=headers)
+    short_key = response.json()["short_key"]
+
+    unreachable_engine = create_engine("localhost", 1)
+    replica_session_factory = async_sessionmaker(unreachable_engine, expire_on_commit=False, info={"replica": True})
+    monkeypatch.setattr("shortly.core.database.replica_session_factory", replica_session_factory)
+
+    link_cache.clear()
+    response = await client.get(short_key)
+    assert response.status_code == settings.REDIRECT_STATUS_CODE
+    assert response.headers["location"] == "http://example.com"
+    assert not setup_replica.usable
+
+    await unreachable_engine.dispose()
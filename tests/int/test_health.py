@@ -22,3 +22,12 @@ async def test_health_with_error(setup_client, monkeypatch: pytest.MonkeyPatch):
 
     response = await client.get("api/health")
     assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_health_db(setup_client):
+    client = setup_client
+
+    response = await client.get("api/health/db")
+    assert response.status_code == 200
+    assert response.json()["checked_out"] >= 0
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import event, text
+
+from shortly.core.database import async_engine, async_session_factory
+from shortly.repository.link import LinkDoesNotExists, LinkRepository
+
+
+@pytest_asyncio.fixture(scope="module")
+async def setup_links_for_plans(setup_client: AsyncClient, auth_headers) -> tuple[int, str]:
+    """Creates a user with a few links and returns user id and one of the keys."""
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_g1")
+
+    response = await client.post(
+        "api/links/batch",
+        json={"links": [{"original_url": f"http://example.com/{i}"} for i in range(10)]},
+        headers=headers,
+    )
+    short_key = response.json()["links"][0]["short_key"]
+
+    # index-only scans need an up to date visibility map
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("VACUUM ANALYZE links")
+
+        results = await conn.execute(text("SELECT user_id FROM links WHERE short_key = :key"), {"key": short_key})
+        user_id = results.scalar_one()
+
+    yield user_id, short_key
+
+
+async def explain(call: Callable[[LinkRepository], Awaitable[Any]]) -> list[dict]:
+    """Runs a repository call and returns plans of its queries, as if the table were large."""
+
+    statements = []
+
+    def capture_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture_statement)
+    try:
+        async with async_session_factory() as session:
+            await call(LinkRepository(session))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture_statement)
+
+    plans = []
+    async with async_engine.connect() as conn:
+        # on a few rows a sequential scan is always cheaper
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        await conn.exec_driver_sql("SET enable_bitmapscan = off")
+        for statement, parameters in statements:
+            results = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plans.append(results.scalar_one()[0]["Plan"])
+        await conn.rollback()
+
+    return plans
+
+
+def scans(plan: dict) -> list[tuple[str, str | None]]:
+    """Returns node type and index name of all scans in a plan."""
+
+    found = []
+    if plan["Node Type"].endswith("Scan"):
+        found.append((plan["Node Type"], plan.get("Index Name")))
+    for subplan in plan.get("Plans", []):
+        found.extend(scans(subplan))
+    return found
+
+
+@pytest.mark.asyncio
+async def test_get_url_by_key_plan(setup_links_for_plans: tuple[int, str]):
+    _, short_key = setup_links_for_plans
+
+    (plan,) = await explain(lambda repo: repo.get_url_by_key(short_key))
+    assert scans(plan) == [("Index Only Scan", "ix_links_short_key_enabled")]
+
+
+@pytest.mark.asyncio
+async def test_get_all_by_user_id_plan(setup_links_for_plans: tuple[int, str]):
+    user_id, _ = setup_links_for_plans
+
+    (plan,) = await explain(lambda repo: repo.get_all_by_user_id(user_id, limit=5))
+    assert scans(plan) == [("Index Scan", "ix_links_user_id_id")]
+
+    (plan,) = await explain(lambda repo: repo.get_all_by_user_id(user_id, limit=5, after_id=1))
+    assert scans(plan) == [("Index Scan", "ix_links_user_id_id")]
+
+
+@pytest.mark.asyncio
+async def test_disable_by_key_and_user_id_plan(setup_links_for_plans: tuple[int, str]):
+    user_id, _ = setup_links_for_plans
+
+    async def disable_missing(repo: LinkRepository):
+        with pytest.raises(LinkDoesNotExists):
+            await repo.disable_by_key_and_user_id("zzzz", user_id)
+
+    (plan,) = await explain(disable_missing)
+    assert scans(plan) and all(node_type.startswith("Index") for node_type, _ in scans(plan))
+
+
+@pytest.mark.asyncio
+async def test_get_most_clicked_plan(setup_links_for_plans: tuple[int, str]):
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+
+    (plan,) = await explain(lambda repo: repo.get_most_clicked(10, since))
+    assert ("Index Only Scan", "ix_link_clicks_hourly_bucket") in scans(plan)
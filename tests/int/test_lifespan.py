@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+import pytest
+from httpx import AsyncClient
+
+from shortly.core.cache import link_cache
+from shortly.core.database import async_engine, async_session_factory, warm_up_pool
+from shortly.core.drain import in_flight
+from shortly.core.security import Hasher
+from shortly.main import app
+from shortly.repository.link import LinkRepository
+from shortly.service import link as link_service
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool(setup_client: AsyncClient):
+    await async_engine.dispose()
+
+    assert await warm_up_pool(async_engine, 3) == 3
+    assert async_engine.pool.checkedin() == 3
+    assert async_engine.pool.checkedout() == 0
+
+
+@pytest.mark.asyncio
+async def test_prewarm_cache(setup_client: AsyncClient, auth_headers):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_i1")
+
+    keys = []
+    for url in ("http://example.com/hot", "http://example.com/cold"):
+        response = await client.post("api/links", json={"original_url": url}, headers=headers)
+        keys.append(response.json()["short_key"])
+    hot_key, cold_key = keys
+
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    async with async_session_factory() as session:
+        repo = LinkRepository(session)
+        await repo.record_clicks({(hot_key, hour): 1_000_000})
+        await session.commit()
+
+        link_cache.clear()
+        assert await link_service.prewarm_cache(repo, 1, 24) == 1
+
+    assert link_cache.get(hot_key).original_url == "http://example.com/hot"
+    assert link_cache.get(cold_key) is None
+
+
+@pytest.mark.asyncio
+async def test_lifespan_restart(setup_client: AsyncClient, auth_headers):
+    client = setup_client
+
+    try:
+        async with app.router.lifespan_context(app):
+            pass
+        assert in_flight.draining
+
+        # a drained app serves requests and hashes passwords once started again
+        async with app.router.lifespan_context(app):
+            assert not in_flight.draining
+
+            headers = await auth_headers("new_test_user_i2")
+            response = await client.get("api/links", headers=headers)
+            assert response.status_code == 200
+    finally:
+        # the other tests run the app without its lifespan
+        Hasher.start()
+        in_flight.stop_draining()
@@ -1,42 +1,135 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
+from sqlalchemy import event, text
 
 from shortly.api.v1.Depends.oauth import get_current_user
+from shortly.core.bloom import KeyFilter
+from shortly.core.config import settings
+from shortly.core.database import async_engine, async_session_factory
+from shortly.core.rate_limit import rate_limiters, TokenBuckets
 from shortly.main import app
+from shortly.models.link import Link, LINKS_ID_BLOCK_SIZE
+from shortly.repository.link import LinkRepository
+from shortly.service.allocator import IdBlockAllocator
+from shortly.service.counter import view_counter
+from shortly.service.expiry import LinkExpirySweeper
+from shortly.service.key_filter import KeyFilterBuilder
+from shortly.service.link import encode_base62
 
 
 @pytest_asyncio.fixture(scope="module")
-async def setup_user(setup_client: AsyncClient) -> dict[str, str]:
-    client = setup_client
+async def setup_user(auth_headers) -> dict[str, str]:
+    yield await auth_headers("new_test_user_a1")
 
-    new_user = {"login": "new_test_user_a1", "password": "super_secure_password"}
 
-    response = await client.post("api/users", json=new_user)
-    response = await client.post(
-        "api/token",
-        data={"username": "new_test_user_a1", "password": "super_secure_password", "grant_type": "password"},
-    )
-    response_data = response.json()
+@pytest.mark.asyncio
+async def test_create_link(setup_client: AsyncClient, setup_user: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user
 
-    headers = {"Authorization": "Bearer " + response_data["access_token"]}
+    og_link = {"original_url": "http://example.com"}
 
-    yield headers
+    response = await client.post("api/links", json=og_link)
+    assert response.status_code == 401
+
+    response = await client.post("api/links", json=og_link, headers=auth_headers)
+    assert response.status_code == 201
 
 
 @pytest.mark.asyncio
-async def test_create_link(setup_client: AsyncClient, setup_user: dict[str, str]):
+async def test_create_link_rate_limit(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch
+):
     client = setup_client
     auth_headers = setup_user
 
+    buckets = TokenBuckets(rate=1, burst=1, max_keys=10)
+    monkeypatch.setitem(rate_limiters, "create_link", buckets)
+
     og_link = {"original_url": "http://example.com"}
 
+    # requests are authenticated before they are counted
     response = await client.post("api/links", json=og_link)
     assert response.status_code == 401
 
     response = await client.post("api/links", json=og_link, headers=auth_headers)
     assert response.status_code == 201
 
+    response = await client.post("api/links", json=og_link, headers=auth_headers)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert len(buckets) == 1
+
+
+@pytest.mark.asyncio
+async def test_create_links_batch(setup_client: AsyncClient, setup_user: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user
+
+    batch = {"links": [{"original_url": "http://example.com/1"}, {"original_url": "example"}, {"url": "a"}]}
+
+    response = await client.post("api/links/batch", json=batch)
+    assert response.status_code == 401
+
+    response = await client.post("api/links/batch", json=batch, headers=auth_headers)
+    assert response.status_code == 201
+
+    created, invalid, missing = response.json()["links"]
+    assert created["short_key"] and not created["error"]
+    assert not invalid["short_key"] and invalid["error"]
+    assert not missing["short_key"] and missing["error"]
+
+    response = await client.get(f"api/links/{created['short_key']}")
+    assert response.status_code == 200
+    assert response.json()["original_url"] == "http://example.com/1"
+
+    batch = {"links": [{"original_url": "http://example.com"}] * 1001}
+
+    response = await client.post("api/links/batch", json=batch, headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("copy_min_links", [1000, 2])
+async def test_create_links_batch_statements(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch, copy_min_links: int
+):
+    client = setup_client
+    auth_headers = setup_user
+
+    monkeypatch.setattr("shortly.repository.link.COPY_MIN_LINKS", copy_min_links)
+    # chunks of two rows
+    monkeypatch.setattr("shortly.repository.link.MAX_BIND_PARAMS", 2 * len(Link.__table__.c))
+
+    inserts = []
+
+    def capture_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO LINKS"):
+            inserts.append(executemany)
+
+    batch = {"links": [{"original_url": f"http://example.com/batch/{i}"} for i in range(3)]}
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture_statement)
+    try:
+        response = await client.post("api/links/batch", json=batch, headers=auth_headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture_statement)
+    assert response.status_code == 201
+
+    # multi-row inserts of at most two rows each, or a copy that is not an insert statement
+    assert inserts == ([False, False] if copy_min_links > 3 else [])
+
+    for i, link in enumerate(response.json()["links"]):
+        response = await client.get(f"api/links/{link['short_key']}/stats")
+        assert response.status_code == 200
+        assert response.json()["original_url"] == f"http://example.com/batch/{i}"
+        assert response.json()["view_count"] == 0
+
 
 @pytest.mark.asyncio
 async def test_get_links(setup_client: AsyncClient, setup_user: dict[str, str]):
@@ -50,6 +143,163 @@ async def test_get_links(setup_client: AsyncClient, setup_user: dict[str, str]):
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_get_links_pages(setup_client: AsyncClient, auth_headers):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_a2")
+
+    batch = {"links": [{"original_url": f"http://example.com/{i}"} for i in range(5)]}
+    response = await client.post("api/links/batch", json=batch, headers=headers)
+    keys = [link["short_key"] for link in response.json()["links"]]
+
+    pages = []
+    url = "api/links?limit=2"
+    while url:
+        response = await client.get(url, headers=headers)
+        assert response.status_code == 200
+        pages.append([link["short_key"] for link in response.json()])
+        url = response.links.get("next", {}).get("url")
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == keys
+
+    response = await client.get("api/links?cursor=bad", headers=headers)
+    assert response.status_code == 400
+
+    response = await client.get("api/links?limit=0", headers=headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_orjson", [True, False])
+async def test_get_links_fast_serialization(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch, use_orjson: bool
+):
+    client = setup_client
+    auth_headers = setup_user
+
+    if not use_orjson:
+        monkeypatch.setattr("shortly.service.link.orjson", None)
+
+    expiry_date = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    og_link = {"original_url": "http://example.com/fast?q=ü", "expiry_date": expiry_date}
+    for _ in range(3):
+        response = await client.post("api/links", json=og_link, headers=auth_headers)
+        assert response.status_code == 201
+
+    response = await client.get("api/links?limit=2", headers=auth_headers)
+    assert response.status_code == 200
+
+    monkeypatch.setattr("shortly.api.v1.links.settings", settings.copy(update={"LINKS_FAST_SERIALIZATION": True}))
+    fast_response = await client.get("api/links?limit=2", headers=auth_headers)
+    assert fast_response.status_code == 200
+    assert fast_response.headers["link"] == response.headers["link"]
+
+    fast_response = await client.get("api/links?limit=1000", headers=auth_headers)
+    monkeypatch.undo()
+    assert json.loads(fast_response.content)
+    response = await client.get("api/links?limit=1000", headers=auth_headers)
+    assert fast_response.content == response.content
+    assert fast_response.headers["content-type"] == response.headers["content-type"]
+
+
+@pytest.mark.asyncio
+async def test_link_deduplication(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch, query_budget
+):
+    client = setup_client
+    auth_headers = setup_user
+
+    monkeypatch.setattr("shortly.service.link.settings", settings.copy(update={"LINK_DEDUPLICATION": True}))
+
+    response = await client.post("api/links", json={"original_url": "http://example.com/dedup"}, headers=auth_headers)
+    assert response.status_code == 201
+    short_key = response.json()["short_key"]
+
+    # same url in another spelling, the link is found by the insert itself
+    with query_budget(1):
+        response = await client.post(
+            "api/links", json={"original_url": "HTTP://Example.COM:80/dedup"}, headers=auth_headers
+        )
+    assert response.status_code == 201
+    assert response.json()["short_key"] == short_key
+
+    for og_link in (
+        {"original_url": "http://example.com/dedup#top"},
+        {"original_url": "http://example.com/dedup", "expiry_date": "2100-01-01T00:00:00"},
+    ):
+        response = await client.post("api/links", json=og_link, headers=auth_headers)
+        assert response.json()["short_key"] != short_key
+
+    response = await client.delete(f"api/links/{short_key}", headers=auth_headers)
+    response = await client.post("api/links", json={"original_url": "http://example.com/dedup"}, headers=auth_headers)
+    assert response.json()["short_key"] != short_key
+
+    response = await client.get(f"api/links/{response.json()['short_key']}")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_link_deduplication_hash_collision(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch
+):
+    client = setup_client
+    auth_headers = setup_user
+
+    monkeypatch.setattr("shortly.service.link.settings", settings.copy(update={"LINK_DEDUPLICATION": True}))
+    monkeypatch.setattr("shortly.service.link.hash_url", lambda url: 42)
+
+    keys = []
+    for url in ("http://example.com/collision/a", "http://example.com/collision/b"):
+        response = await client.post("api/links", json={"original_url": url}, headers=auth_headers)
+        assert response.status_code == 201
+        assert response.json()["original_url"] == url
+        keys.append(response.json()["short_key"])
+    assert keys[0] != keys[1]
+
+    response = await client.get(f"api/links/{keys[1]}")
+    assert response.status_code == 200
+    assert response.json()["original_url"] == "http://example.com/collision/b"
+
+
+@pytest.mark.asyncio
+async def test_export_links(setup_client: AsyncClient, auth_headers):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_a3")
+
+    response = await client.get("api/links/export")
+    assert response.status_code == 401
+
+    response = await client.get("api/links/export", headers=headers)
+    assert response.status_code == 200
+    assert response.text == ""
+
+    batch = {"links": [{"original_url": f"http://example.com/{i}"} for i in range(3)]}
+    response = await client.post("api/links/batch", json=batch, headers=headers)
+    keys = [link["short_key"] for link in response.json()["links"]]
+
+    response = await client.get("api/links/export?format=ndjson", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["short_key"] for row in rows] == keys
+    assert rows[0]["view_count"] == 0
+
+    response = await client.get("api/links/export?format=csv", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["short_key"] for row in rows] == keys
+    assert rows[0]["original_url"] == "http://example.com/0"
+
+    response = await client.get("api/links/export?format=xml", headers=headers)
+    assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_get_link(setup_client: AsyncClient, setup_user: dict[str, str]):
     client = setup_client
@@ -89,9 +339,15 @@ async def test_delete_link(setup_client: AsyncClient, setup_user: dict[str, str]
 
     short_key = response.json()["short_key"]
 
+    response = await client.get(f"api/links/{short_key}")
+    assert response.status_code == 200
+
     response = await client.delete(f"api/links/{short_key}", headers=auth_headers)
     assert response.status_code == 204
 
+    response = await client.get(f"api/links/{short_key}")
+    assert response.status_code == 404
+
 
 @pytest.mark.asyncio
 async def test_stats_link(setup_client: AsyncClient, setup_user: dict[str, str]):
@@ -112,3 +368,219 @@ async def test_stats_link(setup_client: AsyncClient, setup_user: dict[str, str])
     assert response.status_code == 200
     assert response.json()["short_key"] == short_key
     assert response.json()["original_url"] == og_link["original_url"]
+
+
+@pytest.mark.asyncio
+async def test_view_counter(setup_client: AsyncClient, setup_user: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user
+
+    og_link = {"original_url": "http://example.com"}
+
+    response = await client.post("api/links", json=og_link, headers=auth_headers)
+    assert response.status_code == 201
+
+    short_key = response.json()["short_key"]
+
+    for _ in range(3):
+        response = await client.get(f"api/links/{short_key}")
+        assert response.status_code == 200
+
+    await view_counter.flush()
+
+    response = await client.get(f"api/links/{short_key}/stats")
+    assert response.status_code == 200
+    assert response.json()["view_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_stats_timeseries(setup_client: AsyncClient, setup_user: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user
+
+    response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=auth_headers)
+    short_key = response.json()["short_key"]
+
+    # the first view is counted by the database, the rest are served from the cache
+    for _ in range(3):
+        response = await client.get(f"api/links/{short_key}")
+        assert response.status_code == 200
+
+    await view_counter.flush()
+    assert not len(view_counter)
+
+    response = await client.get(f"api/links/{short_key}/stats")
+    assert response.json()["view_count"] == 3
+
+    response = await client.get(f"api/links/{short_key}/stats/timeseries")
+    assert response.status_code == 200
+    response_data = response.json()
+    assert response_data["granularity"] == "hour"
+    assert sum(bucket["clicks"] for bucket in response_data["buckets"]) == 3
+
+    # another flush adds to the same bucket
+    await client.get(f"api/links/{short_key}")
+    await view_counter.flush()
+
+    response = await client.get(f"api/links/{short_key}/stats/timeseries", params={"granularity": "month"})
+    assert response.json()["buckets"][0]["clicks"] == 4
+
+    response = await client.get(
+        f"api/links/{short_key}/stats/timeseries", params={"from": "2020-01-02T00:00:00", "to": "2020-01-01T00:00:00"}
+    )
+    assert response.status_code == 400
+
+    response = await client.get(
+        f"api/links/{short_key}/stats/timeseries", params={"from": "2020-01-01T00:00:00", "to": "2020-01-02T00:00:00"}
+    )
+    assert response.status_code == 200
+    assert not response.json()["buckets"]
+
+    response = await client.get("api/links/1234567/stats/timeseries")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_link_expiry(setup_client: AsyncClient, setup_user: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user
+
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+
+    response = await client.post(
+        "api/links", json={"original_url": "http://example.com", "expiry_date": past}, headers=auth_headers
+    )
+    assert response.status_code == 422
+
+    response = await client.post(
+        "api/links", json={"original_url": "http://example.com", "expiry_date": future}, headers=auth_headers
+    )
+    assert response.status_code == 201
+    assert response.json()["expiry_date"] is not None
+    short_key = response.json()["short_key"]
+
+    response = await client.post(
+        "api/links/batch",
+        json={"links": [{"original_url": "http://example.com", "expiry_date": future}]},
+        headers=auth_headers,
+    )
+    batch_key = response.json()["links"][0]["short_key"]
+
+    response = await client.get(f"api/links/{batch_key}")
+    assert response.status_code == 200
+    assert response.json()["expiry_date"] is not None
+
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "UPDATE links SET expiry_date = now() AT TIME ZONE 'UTC' - interval '1 minute' WHERE short_key = :key"
+            ),
+            {"key": short_key},
+        )
+
+    # expired links are gone before they are swept
+    response = await client.get(f"api/links/{short_key}")
+    assert response.status_code == 404
+
+    response = await client.get(f"api/links/{short_key}/stats")
+    assert response.status_code == 404
+
+    assert await LinkExpirySweeper(interval=60, batch_size=1).sweep() == 1
+
+    async with async_engine.begin() as conn:
+        results = await conn.execute(text("SELECT disabled FROM links WHERE short_key = :key"), {"key": short_key})
+        assert results.scalar_one()
+
+    assert await LinkExpirySweeper(interval=60, batch_size=1).sweep() == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_id_blocks(setup_client: AsyncClient):
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO link_id_blocks (start, reserved_at) "
+                "VALUES (-2000, now() - interval '10 minutes'), (-1000, now())"
+            )
+        )
+
+    # records older than two leases are deleted
+    await LinkExpirySweeper(interval=60, batch_size=1, id_block_lease=60).sweep()
+
+    async with async_engine.begin() as conn:
+        results = await conn.execute(text("SELECT start FROM link_id_blocks WHERE start < 0"))
+        assert list(results.scalars()) == [-1000]
+        await conn.execute(text("DELETE FROM link_id_blocks WHERE start < 0"))
+
+
+@pytest.mark.asyncio
+async def test_key_filter(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch, query_budget
+):
+    client = setup_client
+    auth_headers = setup_user
+
+    key_filter = KeyFilter(capacity=1000, error_rate=0.01)
+    monkeypatch.setattr("shortly.service.link.key_filter", key_filter)
+    monkeypatch.setattr("shortly.repository.link.key_filter", key_filter)
+
+    response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=auth_headers)
+    existing_key = response.json()["short_key"]
+
+    await KeyFilterBuilder(key_filter, rebuild_interval=60, batch_size=2).build()
+    assert key_filter.ready
+
+    response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=auth_headers)
+    new_key = response.json()["short_key"]
+
+    with query_budget(0):
+        response = await client.get("api/links/1234567")
+        assert response.status_code == 404
+
+        response = await client.get("api/links/1234567/stats")
+        assert response.status_code == 404
+
+    for key in (existing_key, new_key):
+        response = await client.get(f"api/links/{key}")
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_key_filter_leased_block(
+    setup_client: AsyncClient, setup_user: dict[str, str], monkeypatch: pytest.MonkeyPatch
+):
+    client = setup_client
+    auth_headers = setup_user
+
+    key_filter = KeyFilter(capacity=1000, error_rate=0.01)
+    monkeypatch.setattr("shortly.service.link.key_filter", key_filter)
+    monkeypatch.setattr("shortly.repository.link.key_filter", key_filter)
+
+    response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=auth_headers)
+    existing_key = response.json()["short_key"]
+
+    # another process holds an earlier block while later ones are reserved
+    other = IdBlockAllocator(LINKS_ID_BLOCK_SIZE, refill_threshold=0, lease=settings.LINK_ID_BLOCK_LEASE)
+    await other.allocate()
+    async with async_session_factory() as session:
+        await LinkRepository(session).get_id_from_sequence()
+
+    await KeyFilterBuilder(key_filter, rebuild_interval=60, batch_size=2).build()
+    assert key_filter.ready
+
+    # a link created from the earlier block after the build, never added to this filter
+    link_id = await other.allocate()
+    key = encode_base62(link_id)
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO links (id, short_key, original_url, user_id, create_date, last_access_date, "
+                "view_count, disabled) SELECT :id, :key, original_url, user_id, now(), now(), 0, false "
+                "FROM links WHERE short_key = :existing_key"
+            ),
+            {"id": link_id, "key": key, "existing_key": existing_key},
+        )
+
+    response = await client.get(f"api/links/{key}")
+    assert response.status_code == 200
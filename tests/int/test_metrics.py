@@ -0,0 +1,47 @@
+import pytest
+from httpx import AsyncClient
+
+from shortly.core.cache import link_cache
+from shortly.core.metrics import http_request_db_queries
+
+
+@pytest.mark.asyncio
+async def test_metrics(setup_client: AsyncClient):
+    client = setup_client
+
+    labels = ("GET", "/api/health")
+    queries, requests = http_request_db_queries.get_sum(labels), http_request_db_queries.get_count(labels)
+
+    response = await client.get("api/health")
+    assert response.status_code == 200
+
+    # the health check runs a single query
+    assert http_request_db_queries.get_count(labels) == requests + 1
+    assert http_request_db_queries.get_sum(labels) == queries + 1
+
+    response = await client.get("metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    lines = response.text.splitlines()
+    assert any(line.startswith('http_requests_total{method="GET",route="/api/health",status="200"} ') for line in lines)
+    assert any(
+        line.startswith('http_request_duration_seconds_count{method="GET",route="/api/health"} ') for line in lines
+    )
+    assert any(line.startswith('db_query_duration_seconds_count{engine="primary"} ') for line in lines)
+    assert any(line.startswith('db_pool_checkout_wait_seconds_count{engine="primary"} ') for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_cache_metrics(setup_client: AsyncClient):
+    client = setup_client
+
+    link_cache.get("abcd")
+    misses = link_cache.misses
+
+    response = await client.get("metrics")
+    lines = response.text.splitlines()
+    assert f'cache_lookups_total{{cache="link",result="miss"}} {misses}' in lines
+    assert any(line.startswith('cache_lookups_total{cache="principal",result="hit"} ') for line in lines)
+    assert any(line.startswith('cache_entries{cache="link"} ') for line in lines)
+    assert any(line.startswith("key_filter_rejected_total ") for line in lines)
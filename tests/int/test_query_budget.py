@@ -0,0 +1,112 @@
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+from shortly.core.cache import link_cache
+from shortly.core.database import async_session_factory
+from shortly.repository.link import LinkRepository
+
+
+@pytest_asyncio.fixture(scope="module")
+async def setup_user_for_budget(setup_client: AsyncClient, auth_headers) -> dict[str, str]:
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_h1")
+
+    # warms up the principal cache and reserves a block of link ids
+    await client.post("api/links", json={"original_url": "http://example.com"}, headers=headers)
+
+    yield headers
+
+
+@pytest.mark.asyncio
+async def test_create_links_budget(setup_client: AsyncClient, setup_user_for_budget: dict[str, str], query_budget):
+    client = setup_client
+    auth_headers = setup_user_for_budget
+
+    # one more statement is allowed for an id block reserved in the background
+    with query_budget(3):
+        response = await client.post("api/links", json={"original_url": "http://example.com"}, headers=auth_headers)
+    assert response.status_code == 201
+
+    with query_budget(2):
+        response = await client.post(
+            "api/links/batch", json={"links": [{"original_url": "http://example.com"}] * 20}, headers=auth_headers
+        )
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_read_links_budget(setup_client: AsyncClient, setup_user_for_budget: dict[str, str], query_budget):
+    client = setup_client
+    auth_headers = setup_user_for_budget
+
+    response = await client.post(
+        "api/links/batch", json={"links": [{"original_url": "http://example.com"}] * 2}, headers=auth_headers
+    )
+    first_key, second_key = (link["short_key"] for link in response.json()["links"])
+    link_cache.clear()
+
+    with query_budget(1):
+        response = await client.get(f"api/links/{first_key}")
+    assert response.status_code == 200
+
+    with query_budget(0):
+        response = await client.get(f"api/links/{first_key}")
+        assert response.status_code == 200
+
+        response = await client.get(f"/{first_key}")
+        assert response.status_code == 307
+
+    with query_budget(1):
+        response = await client.get(f"/{second_key}")
+    assert response.status_code == 307
+
+    with query_budget(1):
+        response = await client.get(f"api/links/{first_key}/stats")
+    assert response.status_code == 200
+
+    with query_budget(2):
+        response = await client.get(f"api/links/{first_key}/stats/timeseries")
+    assert response.status_code == 200
+
+    with query_budget(1):
+        response = await client.get("api/links", headers=auth_headers)
+    assert response.status_code == 200
+
+    with query_budget(2):
+        response = await client.delete(f"api/links/{second_key}", headers=auth_headers)
+    assert response.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_query_log_headers(setup_client: AsyncClient, setup_user_for_budget: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user_for_budget
+
+    response = await client.get("api/links", params={"limit": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["x-db-queries"] == "1"
+    assert response.headers["x-db-rows"] == "2"
+    assert response.headers["x-db-repeated"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_query_budget_flags_repeated_statements(setup_client: AsyncClient, query_budget):
+    async def get_links_one_by_one():
+        async with async_session_factory() as session:
+            repo = LinkRepository(session)
+            for key in ("aaaa", "bbbb"):
+                await repo.get_by_key(key)
+
+    with query_budget(2, allow_repeated=True) as log:
+        await get_links_one_by_one()
+    assert len(log.repeated()) == 1
+
+    with pytest.raises(AssertionError, match="N\\+1"):
+        with query_budget(2):
+            await get_links_one_by_one()
+
+    with pytest.raises(AssertionError, match="over budget"):
+        with query_budget(1, allow_repeated=True):
+            await get_links_one_by_one()
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+from shortly.core.shared_table import SharedLinkTable
+
+
+@pytest_asyncio.fixture(scope="module")
+async def setup_user_for_redirect(auth_headers) -> dict[str, str]:
+    yield await auth_headers("new_test_user_c1")
+
+
+@pytest.mark.asyncio
+async def test_redirect(setup_client: AsyncClient, setup_user_for_redirect: dict[str, str]):
+    client = setup_client
+    auth_headers = setup_user_for_redirect
+
+    og_link = {"original_url": "http://example.com/redirect"}
+
+    response = await client.post("api/links", json=og_link, headers=auth_headers)
+    assert response.status_code == 201
+
+    short_key = response.json()["short_key"]
+
+    # first request reads the database, second one is served from cache
+    for _ in range(2):
+        response = await client.get(f"/{short_key}")
+        assert response.status_code == 307
+        assert response.headers["location"] == og_link["original_url"]
+
+
+@pytest.mark.asyncio
+async def test_redirect_not_found(setup_client: AsyncClient):
+    client = setup_client
+
+    response = await client.get("/1234567")
+    assert response.status_code == 404
+
+    response = await client.get("/abc")
+    assert response.status_code == 404
+
+    response = await client.get("/abc_def")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_redirect_shared_table(
+    setup_client: AsyncClient,
+    setup_user_for_redirect: dict[str, str],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    client = setup_client
+    auth_headers = setup_user_for_redirect
+
+    table = SharedLinkTable(str(tmp_path / "links"), slots=64, url_size=64, ttl=60)
+    monkeypatch.setattr("shortly.service.link.shared_link_table", table)
+    monkeypatch.setattr("shortly.repository.link.shared_link_table", table)
+
+    og_link = {"original_url": "http://example.com/shared"}
+
+    response = await client.post("api/links", json=og_link, headers=auth_headers)
+    short_key = response.json()["short_key"]
+
+    for _ in range(2):
+        response = await client.get(f"/{short_key}")
+        assert response.status_code == 307
+        assert response.headers["location"] == og_link["original_url"]
+
+    assert table.get(short_key) == og_link["original_url"]
+
+    response = await client.delete(f"api/links/{short_key}", headers=auth_headers)
+    assert response.status_code == 204
+
+    assert table.get(short_key) is None
+
+    response = await client.get(f"/{short_key}")
+    assert response.status_code == 404
+    table.close()
@@ -1,6 +1,9 @@
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event
 
+from shortly.core.cache import principal_cache
+from shortly.models.link import Link
 from shortly.schemas.user import UserInDB
 from shortly.api.v1.Depends.oauth import get_current_user
 from shortly.main import app
@@ -66,3 +69,52 @@ async def test_user_delete(setup_client: AsyncClient, monkeypatch: pytest.Monkey
     assert response.status_code == 204
 
     app.dependency_overrides = {}
+
+
+@pytest.mark.asyncio
+async def test_user_me_does_not_load_links(setup_client: AsyncClient, auth_headers, query_budget):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_d1")
+
+    batch = {"links": [{"original_url": "http://example.com"}] * 50}
+    response = await client.post("api/links/batch", json=batch, headers=headers)
+    assert response.status_code == 201
+
+    principal_cache.clear()
+
+    loaded_links = []
+
+    def count_link(target, context):
+        loaded_links.append(target)
+
+    event.listen(Link, "load", count_link)
+    try:
+        with query_budget(1):
+            response = await client.get("api/users/me", headers=headers)
+    finally:
+        event.remove(Link, "load", count_link)
+
+    assert response.status_code == 200
+    assert not loaded_links
+
+
+@pytest.mark.asyncio
+async def test_user_principal_cache(setup_client: AsyncClient, auth_headers, query_budget):
+    client = setup_client
+
+    headers = await auth_headers("new_test_user_e1")
+
+    response = await client.get("api/users/me", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(0):
+        response = await client.get("api/users/me", headers=headers)
+
+    assert response.status_code == 200
+
+    response = await client.delete("api/users/0", headers=headers)
+    assert response.status_code == 204
+
+    response = await client.get("api/users/me", headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from shortly.service.allocator import IdBlockAllocator
+
+
+class FakeSequence:
+    def __init__(self, start: int, increment: int) -> None:
+        self.value = start - increment
+        self.increment = increment
+        self.calls = 0
+
+    async def next_value(self) -> int:
+        await asyncio.sleep(0)
+        self.calls += 1
+        self.value += self.increment
+        return self.value
+
+
+@pytest.mark.asyncio
+async def test_allocator_blocks(monkeypatch: pytest.MonkeyPatch):
+    sequence = FakeSequence(start=1000, increment=10)
+    allocator = IdBlockAllocator(block_size=10, refill_threshold=3)
+    monkeypatch.setattr(allocator, "_fetch_block", sequence.next_value)
+
+    ids = [await allocator.allocate() for _ in range(25)]
+
+    assert ids == list(range(1000, 1025))
+    assert sequence.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_allocator_concurrent(monkeypatch: pytest.MonkeyPatch):
+    sequence = FakeSequence(start=1000, increment=10)
+    allocator = IdBlockAllocator(block_size=10, refill_threshold=3)
+    monkeypatch.setattr(allocator, "_fetch_block", sequence.next_value)
+
+    ids = await asyncio.gather(*(allocator.allocate() for _ in range(100)))
+
+    assert len(set(ids)) == 100
+    assert all(1000 <= link_id < 1000 + sequence.calls * 10 for link_id in ids)
+
+
+@pytest.mark.asyncio
+async def test_allocator_many(monkeypatch: pytest.MonkeyPatch):
+    sequence = FakeSequence(start=1000, increment=10)
+    allocator = IdBlockAllocator(block_size=10, refill_threshold=0)
+    monkeypatch.setattr(allocator, "_fetch_block", sequence.next_value)
+
+    async def fetch_blocks(count: int) -> list[int]:
+        return [await sequence.next_value() for _ in range(count)]
+
+    monkeypatch.setattr(allocator, "_fetch_blocks", fetch_blocks)
+
+    first = await allocator.allocate()
+    ids = await allocator.allocate_many(25)
+    last = await allocator.allocate()
+
+    assert first == 1000
+    assert ids == list(range(1001, 1026))
+    assert last == 1026
+    assert sequence.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_allocator_lease(monkeypatch: pytest.MonkeyPatch):
+    sequence = FakeSequence(start=1000, increment=10)
+    allocator = IdBlockAllocator(block_size=10, refill_threshold=0, lease=60)
+    monkeypatch.setattr(allocator, "_fetch_block", sequence.next_value)
+
+    renewed = []
+
+    async def renew_block(start: int) -> bool:
+        renewed.append(start)
+        return len(renewed) == 1
+
+    monkeypatch.setattr(allocator, "_renew_block", renew_block)
+
+    now = 100.0
+    monkeypatch.setattr("shortly.service.allocator.time.monotonic", lambda: now)
+    assert await allocator.allocate() == 1000
+
+    # an expired block is renewed and used further
+    now = 160.0
+    assert await allocator.allocate() == 1001
+
+    # a block that could not be renewed is given up
+    now = 220.0
+    assert await allocator.allocate() == 1010
+    assert renewed == [1000, 1000]
+    assert sequence.calls == 2
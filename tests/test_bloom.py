@@ -0,0 +1,47 @@
+from shortly.core.bloom import BloomFilter, KeyFilter
+from shortly.service.link import encode_base62
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+
+    keys = [encode_base62(i) for i in range(500_000, 501_000)]
+    for key in keys:
+        bloom_filter.add(key)
+
+    assert all(key in bloom_filter for key in keys)
+
+    false_positives = sum(encode_base62(i) in bloom_filter for i in range(1_000_000, 1_010_000))
+    assert false_positives < 300
+
+
+def test_key_filter():
+    key_filter = KeyFilter(capacity=1000, error_rate=0.01)
+
+    # everything passes until the filter is built
+    assert key_filter.might_exist("abcd")
+
+    bloom_filter = key_filter.begin_build()
+    bloom_filter.add(encode_base62(500_000))
+    key_filter.add(encode_base62(500_001))
+    key_filter.finish_build(501_000, 502_000)
+    key_filter.add(encode_base62(500_002))
+
+    assert key_filter.ready
+    assert key_filter.might_exist(encode_base62(500_000))
+    assert key_filter.might_exist(encode_base62(500_001))
+    assert key_filter.might_exist(encode_base62(500_002))
+    assert not key_filter.might_exist(encode_base62(500_003))
+
+    # keys between the watermark and the ceiling may come from other processes
+    assert key_filter.might_exist(encode_base62(501_000))
+    assert key_filter.might_exist(encode_base62(501_999))
+    assert not key_filter.might_exist(encode_base62(502_000))
+    assert not key_filter.might_exist(encode_base62(10**9))
+
+    key_filter.set_ceiling(503_000)
+    assert key_filter.might_exist(encode_base62(502_000))
+
+    assert not key_filter.might_exist("0" + encode_base62(501_000))
+    assert not key_filter.might_exist("ключ")
+    assert key_filter.rejected == 5
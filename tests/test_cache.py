@@ -0,0 +1,53 @@
+import pytest
+
+from shortly.core.cache import TTLCache
+
+
+def test_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert stats.hits == 3
+    assert stats.misses == 1
+    assert stats.evictions == 1
+    assert stats.size == 2
+
+
+def test_cache_ttl(monkeypatch: pytest.MonkeyPatch):
+    cache = TTLCache(maxsize=10, ttl=5)
+
+    monkeypatch.setattr("shortly.core.cache.time.monotonic", lambda: 100.0)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    monkeypatch.setattr("shortly.core.cache.time.monotonic", lambda: 105.0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+    monkeypatch.setattr("shortly.core.cache.time.monotonic", lambda: 100.0)
+    cache.set("b", 2, ttl=1)
+    cache.set("c", 3, ttl=60)
+
+    monkeypatch.setattr("shortly.core.cache.time.monotonic", lambda: 101.0)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    # an entry never outlives the cache ttl
+    monkeypatch.setattr("shortly.core.cache.time.monotonic", lambda: 105.0)
+    assert cache.get("c") is None
+
+
+def test_cache_disabled():
+    cache = TTLCache(maxsize=0, ttl=5)
+
+    cache.set("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from shortly.service.counter import ViewCounterBuffer
+
+
+class FakeRepository:
+    """Repository writing view counters once released."""
+
+    release: asyncio.Event
+    written: list[dict[str, int]]
+
+    def __init__(self, session) -> None:
+        pass
+
+    async def increase_view_counters(self, counters: dict[str, int]) -> None:
+        await self.release.wait()
+        FakeRepository.written.append(counters)
+
+    async def record_clicks(self, clicks: dict) -> None:
+        pass
+
+
+@pytest.fixture
+def repository(monkeypatch: pytest.MonkeyPatch) -> type[FakeRepository]:
+    FakeRepository.release = asyncio.Event()
+    FakeRepository.written = []
+    monkeypatch.setattr("shortly.service.counter.LinkRepository", FakeRepository)
+    return FakeRepository
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush(repository: type[FakeRepository]):
+    buffer = ViewCounterBuffer(flush_interval=60, max_keys=100)
+    buffer.add("abcd")
+
+    flush = asyncio.create_task(buffer.flush())
+    await asyncio.sleep(0.01)
+    assert not len(buffer)
+
+    # views being written are put back
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    assert len(buffer) == 1
+
+    repository.release.set()
+    await buffer.flush()
+    assert repository.written == [{"abcd": 1}]
+
+
+@pytest.mark.asyncio
+async def test_stop_during_flush(repository: type[FakeRepository]):
+    buffer = ViewCounterBuffer(flush_interval=60, max_keys=1)
+    buffer.start()
+    buffer.add("abcd")
+    await asyncio.sleep(0.01)
+
+    # the flush in progress is finished, not cancelled
+    stop = asyncio.create_task(buffer.stop())
+    await asyncio.sleep(0.01)
+    assert not stop.done()
+
+    repository.release.set()
+    await stop
+    assert repository.written == [{"abcd": 1}]
+    assert not len(buffer)
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from shortly.core.drain import DrainMiddleware, InFlightRequests
+
+
+@pytest.mark.asyncio
+async def test_drain_middleware():
+    requests = InFlightRequests()
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200})
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    middleware = DrainMiddleware(app, requests)
+    pending = asyncio.create_task(middleware({"type": "http"}, None, send))
+    await asyncio.sleep(0)
+    assert requests.active == 1
+
+    # new requests are rejected, the one in flight is waited for
+    requests.start_draining()
+    await middleware({"type": "http"}, None, send)
+    assert statuses == [503]
+    assert not await requests.wait_idle(0.01)
+
+    release.set()
+    assert await requests.wait_idle(1)
+    await pending
+    assert statuses == [503, 200]
+    assert requests.active == 0
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from shortly.core.metrics import CollectedMetric, Counter, Histogram, MetricsMiddleware, request_db_stats
+
+
+def test_counter_render():
+    counter = Counter("requests_total", "Requests.", ("route",))
+    counter.inc(("/a",))
+    counter.inc(("/a",), 2)
+    counter.inc(('say "hi"',))
+
+    assert counter.get(("/a",)) == 3
+    assert counter.render() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a"} 3',
+        'requests_total{route="say \\"hi\\""} 1',
+    ]
+
+
+def test_histogram_render():
+    histogram = Histogram("duration_seconds", "Duration.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(("/a",), value)
+
+    assert histogram.get_count(("/a",)) == 4
+    assert histogram.get_sum(("/a",)) == pytest.approx(2.65)
+    assert histogram.render()[2:] == [
+        'duration_seconds_bucket{route="/a",le="0.1"} 2',
+        'duration_seconds_bucket{route="/a",le="1"} 3',
+        'duration_seconds_bucket{route="/a",le="+Inf"} 4',
+        'duration_seconds_sum{route="/a"} 2.65',
+        'duration_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_collected_metric_render():
+    values = {("link", "hit"): 2}
+    metric = CollectedMetric("lookups_total", "Lookups.", "counter", ("cache", "result"), lambda: values)
+
+    values[("link", "miss")] = 1
+    assert metric.render() == [
+        "# HELP lookups_total Lookups.",
+        "# TYPE lookups_total counter",
+        'lookups_total{cache="link",result="hit"} 2',
+        'lookups_total{cache="link",result="miss"} 1',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_middleware(monkeypatch: pytest.MonkeyPatch):
+    requests = Counter("requests_total", "Requests.", ("method", "route", "status"))
+    queries = Histogram("queries", "Queries.", ("method", "route"), buckets=(1, 2))
+    monkeypatch.setattr("shortly.core.metrics.http_requests_total", requests)
+    monkeypatch.setattr("shortly.core.metrics.http_request_db_queries", queries)
+
+    async def endpoint():
+        pass
+
+    class App:
+        routes = [SimpleNamespace(path="/items/{key}", endpoint=endpoint)]
+
+        async def __call__(self, scope, receive, send):
+            # what the router and a query listener would do
+            scope["endpoint"] = endpoint
+            request_db_stats.get()[0] += 2
+            await send({"type": "http.response.start", "status": 404})
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(App())
+    for _ in range(2):
+        await middleware({"type": "http", "method": "GET", "app": middleware.app}, None, send)
+
+    assert requests.get(("GET", "/items/{key}", "404")) == 2
+    assert queries.get_count(("GET", "/items/{key}")) == 2
+    assert queries.get_sum(("GET", "/items/{key}")) == 4
+    assert request_db_stats.get() is None
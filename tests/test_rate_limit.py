@@ -0,0 +1,43 @@
+import pytest
+
+from shortly.core.rate_limit import TokenBuckets
+
+
+def test_token_buckets(monkeypatch: pytest.MonkeyPatch):
+    buckets = TokenBuckets(rate=2, burst=3, max_keys=10)
+
+    monkeypatch.setattr("shortly.core.rate_limit.time.monotonic", lambda: 100.0)
+    assert [buckets.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.acquire("a") == pytest.approx(0.5)
+    assert buckets.acquire("b") == 0
+
+    # half a second refills one token
+    monkeypatch.setattr("shortly.core.rate_limit.time.monotonic", lambda: 100.5)
+    assert buckets.acquire("a") == 0
+    assert buckets.acquire("a") == pytest.approx(0.5)
+
+
+def test_token_buckets_eviction(monkeypatch: pytest.MonkeyPatch):
+    buckets = TokenBuckets(rate=1, burst=2, max_keys=2)
+
+    monkeypatch.setattr("shortly.core.rate_limit.time.monotonic", lambda: 100.0)
+    buckets.acquire("a")
+    buckets.acquire("b")
+    assert buckets.acquire("a") == 0
+    assert buckets.acquire("a") == pytest.approx(1)
+
+    # all buckets are refilling, new keys share one without resetting the others
+    assert [buckets.acquire(key) for key in ("c", "x", "y")] == [0, 0, pytest.approx(1)]
+    assert buckets.acquire("a") == pytest.approx(1)
+    assert len(buckets) == 2
+
+    # refilled buckets are dropped as new keys come in
+    monkeypatch.setattr("shortly.core.rate_limit.time.monotonic", lambda: 101.5)
+    buckets.acquire("b")
+    monkeypatch.setattr("shortly.core.rate_limit.time.monotonic", lambda: 102.0)
+    buckets.acquire("d")
+    assert len(buckets) == 2
+
+    monkeypatch.setattr("shortly.core.rate_limit.time.monotonic", lambda: 110.0)
+    buckets.acquire("e")
+    assert len(buckets) == 1
@@ -1,6 +1,6 @@
 import pytest
 
-from shortly.core.security import Hasher, generate_token, decode_token, TokenType
+from shortly.core.security import Hasher, HasherBusy, generate_token, decode_token, TokenType
 
 
 @pytest.mark.asyncio
@@ -26,3 +26,17 @@ async def test_tokens_gen():
     payload = decode_token(token)
 
     assert int(payload.sub) == user_id
+
+
+@pytest.mark.asyncio
+async def test_hasher_async(monkeypatch: pytest.MonkeyPatch):
+    plain_password = "my_super_secure_password"
+
+    hashed_pwd = await Hasher.get_password_hash_async(plain_password)
+    assert await Hasher.verify_password_async(plain_password, hashed_pwd)
+    assert not await Hasher.verify_password_async("wrong_password", hashed_pwd)
+
+    monkeypatch.setattr(Hasher, "max_pending", 0)
+
+    with pytest.raises(HasherBusy):
+        await Hasher.verify_password_async(plain_password, hashed_pwd)
@@ -0,0 +1,113 @@
+import fcntl
+import time
+from pathlib import Path
+
+import pytest
+
+from shortly.core.shared_table import SharedLinkTable
+
+
+def test_shared_table(tmp_path: Path):
+    table = SharedLinkTable(str(tmp_path / "links"), slots=64, url_size=32, ttl=60)
+
+    assert table.get("abcd") is None
+
+    table.set("abcd", "http://example.com")
+    assert table.get("abcd") == "http://example.com"
+
+    table.set("abcd", "http://example.com/other")
+    assert table.get("abcd") == "http://example.com/other"
+
+    table.set("efgh", "http://example.com/" + "a" * 32)
+    assert table.get("efgh") is None
+
+    table.invalidate("abcd")
+    assert table.get("abcd") is None
+
+    assert table.hits == 2
+    assert table.misses == 3
+    table.close()
+
+
+def test_shared_table_expiry(tmp_path: Path):
+    table = SharedLinkTable(str(tmp_path / "links"), slots=64, url_size=32, ttl=60)
+
+    expires_at = int(time.time()) + 60
+    table.set("abcd", "http://example.com", expires_at)
+    assert table.get_entry("abcd") == ("http://example.com", expires_at)
+
+    table.set("efgh", "http://example.com", time.time() - 1)
+    assert table.get("efgh") is None
+
+    table.set("efgh", "http://example.com")
+    assert table.get_entry("efgh") == ("http://example.com", None)
+    table.close()
+
+
+def test_shared_table_between_processes(tmp_path: Path):
+    path = str(tmp_path / "links")
+    first = SharedLinkTable(path, slots=64, url_size=32, ttl=60)
+    second = SharedLinkTable(path, slots=64, url_size=32, ttl=60)
+
+    first.set("abcd", "http://example.com")
+    assert second.get("abcd") == "http://example.com"
+
+    second.invalidate("abcd")
+    assert first.get("abcd") is None
+
+    # another layout starts from an empty table
+    third = SharedLinkTable(path, slots=32, url_size=32, ttl=60)
+    first.set("abcd", "http://example.com")
+    assert third.get("abcd") is None
+
+    for table in (first, second, third):
+        table.close()
+
+
+def test_shared_table_collisions(tmp_path: Path):
+    table = SharedLinkTable(str(tmp_path / "links"), slots=2, url_size=32, ttl=60)
+
+    keys = ["aaaa", "bbbb", "cccc", "dddd"]
+    for key in keys:
+        table.set(key, f"http://example.com/{key}")
+
+    assert table.get("dddd") == "http://example.com/dddd"
+    assert sum(table.get(key) is not None for key in keys) == 2
+    table.close()
+
+
+def test_shared_table_ttl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    table = SharedLinkTable(str(tmp_path / "links"), slots=64, url_size=32, ttl=60)
+
+    monkeypatch.setattr("shortly.core.shared_table.time.time", lambda: 1000.0)
+    table.set("abcd", "http://example.com")
+    assert table.get("abcd") == "http://example.com"
+
+    monkeypatch.setattr("shortly.core.shared_table.time.time", lambda: 1060.0)
+    assert table.get("abcd") is None
+    table.close()
+
+
+def test_shared_table_replaced_while_waiting(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    path = str(tmp_path / "links")
+    SharedLinkTable(path, slots=64, url_size=32, ttl=60).close()
+
+    # another process replaces the table of the old layout while this one waits for the lock on it
+    tables = []
+    flock = fcntl.flock
+
+    def flock_after_replace(fd, operation):
+        if not tables:
+            monkeypatch.setattr("shortly.core.shared_table.fcntl.flock", flock)
+            tables.append(SharedLinkTable(path, slots=32, url_size=32, ttl=60))
+        flock(fd, operation)
+
+    monkeypatch.setattr("shortly.core.shared_table.fcntl.flock", flock_after_replace)
+    first = SharedLinkTable(path, slots=32, url_size=32, ttl=60)
+    (second,) = tables
+
+    first.set("abcd", "http://example.com")
+    assert second.get("abcd") == "http://example.com"
+
+    for table in (first, second):
+        table.close()